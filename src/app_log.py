@@ -0,0 +1,133 @@
+# src/app_log.py
+import json
+import logging
+import logging.handlers
+import queue
+import threading
+from pathlib import Path
+
+LOG_FILE = "heimlich.jsonl"
+
+# sesión actual, agregada a cada registro que no trae una propia
+_context = {"session": None}
+# sesión propia de un hilo que trabaja sobre otra (p. ej. el spool reenviando una sesión vieja)
+_thread_context = threading.local()
+
+
+def set_session(session):
+    """Sesión que se adjunta a los registros siguientes (None al terminar la sesión)."""
+    _context["session"] = session
+
+
+def set_thread_session(session):
+    """Sesión para los registros de este hilo, en lugar de la sesión en curso (None = ninguna)."""
+    _thread_context.session = session
+
+
+class _ContextFilter(logging.Filter):
+    # corre en el hilo que emite el registro (antes de encolarlo)
+    def filter(self, record):
+        if not hasattr(record, "session"):
+            record.session = getattr(_thread_context, "session", _context["session"])
+        if not hasattr(record, "seq"):
+            record.seq = None
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """Un objeto JSON por línea: ts, nivel, módulo, mensaje, sesión y frame."""
+
+    def format(self, record):
+        data = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            "session": getattr(record, "session", None),
+            "seq": getattr(record, "seq", None),
+        }
+        if record.exc_info:
+            data["exc"] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+
+
+class _BufferedRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """RotatingFileHandler que no hace flush por registro: lo hace el LogWriter por lote."""
+
+    def emit(self, record):
+        try:
+            if self.shouldRollover(record):
+                self.doRollover()
+            if self.stream is None:
+                self.stream = self._open()
+            self.stream.write(self.format(record) + self.terminator)
+        except Exception:
+            self.handleError(record)
+
+
+class LogWriter:
+    """Hilo que saca registros de la cola y los pasa a los handlers en lote.
+
+    Cada vuelta toma lo encolado (hasta `batch_size`), lo escribe y hace un solo flush.
+    El resto de la app sólo encola a través del QueueHandler instalado en el logger raíz.
+    """
+
+    def __init__(self, log_queue: queue.Queue, handlers, batch_size: int = 256):
+        self._queue = log_queue
+        self.handlers = handlers
+        self.batch_size = batch_size
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = False
+            for record in batch:
+                if record is None:
+                    stop = True
+                    continue
+                for handler in self.handlers:
+                    if record.levelno >= handler.level:
+                        handler.handle(record)
+            for handler in self.handlers:
+                handler.flush()
+            if stop:
+                return
+
+    def close(self, timeout: float = 2.0):
+        self._queue.put(None)
+        self._thread.join(timeout)
+        for handler in self.handlers:
+            handler.close()
+
+
+def setup_logging(log_dir, level: str = "INFO", file_level: str = "INFO", max_bytes: int = 5 * 2**20,
+                  backups: int = 5, batch_size: int = 256) -> LogWriter:
+    """Instala el logging de la app: consola con el mismo formato que los print de siempre y
+    un archivo JSON rotado por tamaño en `log_dir`. Devuelve el LogWriter para cerrarlo al salir.
+    """
+    log_dir = Path(log_dir)
+    log_dir.mkdir(parents=True, exist_ok=True)
+
+    console = logging.StreamHandler()
+    console.setLevel(level)
+    console.setFormatter(logging.Formatter("%(message)s"))
+    json_file = _BufferedRotatingFileHandler(log_dir / LOG_FILE, maxBytes=max_bytes, backupCount=backups,
+                                             encoding="utf-8", delay=True)
+    json_file.setLevel(file_level)
+    json_file.setFormatter(JsonFormatter())
+
+    log_queue = queue.SimpleQueue()
+    enqueue = logging.handlers.QueueHandler(log_queue)
+    enqueue.addFilter(_ContextFilter())
+    root = logging.getLogger()
+    root.handlers[:] = [enqueue]
+    # el umbral del logger raíz es el menor de los dos: lo que no va a ningún lado ni se encola
+    root.setLevel(min(console.level, json_file.level))
+    return LogWriter(log_queue, [console, json_file], batch_size)
@@ -0,0 +1,367 @@
+# src/capture.py
+import logging
+import threading
+import time
+
+import cv2
+import numpy as np
+from PySide6.QtCore import QThread, Signal
+
+log = logging.getLogger(__name__)
+
+# Un frame que el GUI toma con más de esta antigüedad se cuenta como tardío
+LATE_FRAME_MS = 60
+
+# Factor de reducción al decodificar MJPEG para la vista previa -> flag de cv2.imdecode
+_REDUCED_DECODE = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+
+
+class FramePool:
+    """Pool de buffers BGR preasignados para leer la cámara sin asignar memoria por frame.
+
+    Los buffers se crean con la forma del primer frame (y se recrean si cambia la
+    resolución). Si no queda ninguno libre, acquire() devuelve None y el lector asigna uno
+    nuevo para ese frame; se cuenta en `exhausted`.
+    """
+
+    def __init__(self, size: int = 4):
+        self.size = size
+        self._lock = threading.Lock()
+        self._free = []
+        self._shape = None
+        self.exhausted = 0
+
+    def resize(self, shape):
+        with self._lock:
+            if shape != self._shape:
+                self._shape = shape
+                self._free = [np.empty(shape, dtype=np.uint8) for _ in range(self.size)]
+
+    def acquire(self):
+        with self._lock:
+            if self._shape is None:
+                return None
+            if not self._free:
+                self.exhausted += 1
+                return None
+            return self._free.pop()
+
+    def release(self, buf):
+        with self._lock:
+            # los buffers de una resolución anterior no vuelven al pool
+            if buf.shape == self._shape and len(self._free) < self.size:
+                self._free.append(buf)
+
+
+class CapturedFrame:
+    """Frame publicado por el hilo de captura.
+
+    `image` es el frame BGR (en modo MJPEG, decodificado a escala reducida sólo para la
+    vista previa). `jpeg` son los bytes comprimidos tal como los entregó la cámara, o None
+    si la cámara no entrega MJPEG. `captured_at` es el time.monotonic() del grab().
+
+    Si `image` es un buffer de un FramePool, el frame tiene un único dueño a la vez: el
+    FrameSlot mientras espera, y después quien lo toma con take() (el GUI). El dueño llama a
+    release() cuando deja de usarlo y el buffer vuelve al pool; quien necesite conservar
+    los píxeles más allá de eso (p. ej. un almacén de la sesión) tiene que copiarlos.
+
+    Con ProcessCaptureWorker `image` es una vista del FrameRing (slot del frame `seq`): el
+    proceso de captura la vuelve a escribir si el GUI se atrasa `slots` frames. Para
+    codificarla o guardarla hay que pasar por stable().
+    """
+
+    __slots__ = ("image", "jpeg", "captured_at", "seq", "_pool", "_ring")
+
+    def __init__(self, image, jpeg: bytes = None, captured_at: float = None, pool: FramePool = None,
+                 seq: int = None, ring=None):
+        self.image = image
+        self.jpeg = jpeg
+        self.captured_at = time.monotonic() if captured_at is None else captured_at
+        self.seq = seq
+        self._pool = pool
+        self._ring = ring
+
+    def stable(self, out=None):
+        """Píxeles que no cambian mientras se usan, o None si el slot del anillo ya se pisó.
+
+        Fuera del anillo es `image` tal cual. Con anillo se copia a `out` (se reserva si no
+        sirve) y después se verifica que el slot siga siendo de este seq: si no, la copia
+        puede haber quedado a medias y el frame se saltea.
+        """
+        if self._ring is None:
+            return self.image
+        if out is None or out.shape != self.image.shape:
+            out = np.empty_like(self.image)
+        np.copyto(out, self.image)
+        return out if self._ring.is_current(self.seq) else None
+
+    def release(self):
+        """Devuelve el buffer al pool. Después de esto `image` no se debe usar."""
+        pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.release(self.image)
+
+
+class FrameSlot:
+    """Buffer de un solo lugar protegido por lock: siempre conserva el frame más reciente.
+
+    El hilo de captura escribe con put() y el hilo del GUI lee con take().
+    Si llega un frame nuevo antes de que el anterior se haya consumido, el anterior
+    se descarta (devolviendo su buffer al pool) y se cuenta en `dropped`.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._frame = None
+        self._stamp = 0.0
+        self._pending = False
+        self.captured = 0
+        self.dropped = 0
+        self.late = 0
+
+    def put(self, frame) -> bool:
+        """Publica un frame. Devuelve True si el slot estaba vacío (hay que notificar al GUI)."""
+        with self._lock:
+            was_pending = self._pending
+            if was_pending:
+                self.dropped += 1
+                self._frame.release()
+            self._frame = frame
+            self._stamp = time.monotonic()
+            self._pending = True
+            self.captured += 1
+        return not was_pending
+
+    def take(self):
+        """Devuelve el frame pendiente más reciente o None si no hay nada nuevo."""
+        with self._lock:
+            if not self._pending:
+                return None
+            frame = self._frame
+            age_ms = (time.monotonic() - self._stamp) * 1000
+            self._frame = None
+            self._pending = False
+            if age_ms > LATE_FRAME_MS:
+                self.late += 1
+        return frame
+
+    def clear(self):
+        """Descarta el frame pendiente, si lo hay."""
+        with self._lock:
+            if self._pending:
+                self._frame.release()
+            self._frame = None
+            self._pending = False
+
+    def reset_stats(self):
+        with self._lock:
+            self.captured = 0
+            self.dropped = 0
+            self.late = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"captured": self.captured, "dropped": self.dropped, "late": self.late}
+
+
+class CaptureWorker(QThread):
+    """Hilo dueño del cv2.VideoCapture: lee frames sin bloquear el GUI y los publica en un FrameSlot.
+
+    Con `mjpeg=True` pide FOURCC MJPG con CAP_PROP_CONVERT_RGB desactivado, de modo que
+    OpenCV entrega el bitstream JPEG de la cámara sin decodificarlo. Ese JPEG se publica tal
+    cual (para disco y predicción) y sólo se decodifica una copia reducida para la vista previa.
+    Si la cámara o el backend no lo soportan, se sigue con frames BGR normales.
+
+    Para no enviar frames viejos del buffer interno de OpenCV se pide CAP_PROP_BUFFERSIZE
+    chico y, antes de cada retrieve(), se descartan con grab() los frames que ya estaban
+    encolados: un grab() que vuelve en menos de `drain_ms` no esperó a la cámara, así que
+    ese frame era viejo. Sólo se decodifica (retrieve) el último.
+
+    Los frames BGR se decodifican con retrieve(image) dentro de buffers de un FramePool,
+    así el loop de lectura no asigna memoria por frame (ver CapturedFrame para el manejo
+    de dueños).
+    """
+
+    # Se emite cuando hay un frame nuevo en el slot (conectar con Qt.QueuedConnection)
+    frame_ready = Signal()
+
+    def __init__(self, device=0, mjpeg: bool = False, preview_reduction: int = 2,
+                 buffer_size: int = 1, drain_ms: float = 4.0, max_drain: int = 4,
+                 pool_size: int = 4, parent=None):
+        super().__init__(parent)
+        self.device = device
+        self.mjpeg = mjpeg
+        self.buffer_size = buffer_size
+        self.drain_ms = drain_ms
+        self.max_drain = max_drain
+        self.drained = 0
+        self.preview_flag = _REDUCED_DECODE.get(preview_reduction, cv2.IMREAD_REDUCED_COLOR_2)
+        self.slot = FrameSlot()
+        self.pool = FramePool(pool_size)
+        self._running = False
+
+    def _open(self):
+        cap = cv2.VideoCapture(self.device)
+        if self.mjpeg:
+            cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*"MJPG"))
+            cap.set(cv2.CAP_PROP_CONVERT_RGB, 0)
+        if self.buffer_size:
+            # no todos los backends lo respetan; el drenaje de abajo cubre el resto
+            cap.set(cv2.CAP_PROP_BUFFERSIZE, self.buffer_size)
+        return cap
+
+    def _grab_freshest(self, cap) -> bool:
+        """grab() hasta llegar a un frame que realmente hubo que esperar (el más nuevo)."""
+        for _ in range(self.max_drain + 1):
+            t0 = time.monotonic()
+            if not cap.grab():
+                return False
+            if (time.monotonic() - t0) * 1000 >= self.drain_ms:
+                return True
+            self.drained += 1
+        return True
+
+    def _retrieve(self, cap):
+        """retrieve() sobre un buffer del pool. Devuelve (ok, imagen, pooled)."""
+        buf = self.pool.acquire()
+        if buf is None:
+            ok, raw = cap.retrieve()
+        else:
+            ok, raw = cap.retrieve(buf)
+        pooled = ok and buf is not None and raw.shape == buf.shape and raw.ctypes.data == buf.ctypes.data
+        if not pooled:
+            if buf is not None:
+                self.pool.release(buf)
+            if ok and raw.ndim == 3:
+                # primer frame o cambio de resolución: dimensionar el pool
+                self.pool.resize(raw.shape)
+        return ok, raw, pooled
+
+    def _to_frame(self, raw, captured_at: float, pooled: bool):
+        """Arma el CapturedFrame: si lo leído es un buffer comprimido (1 fila u 1-D), es MJPEG."""
+        if raw.ndim == 1 or (raw.ndim == 2 and raw.shape[0] == 1):
+            preview = cv2.imdecode(raw.reshape(-1), self.preview_flag)
+            if preview is None:
+                return None
+            return CapturedFrame(preview, raw.tobytes(), captured_at)
+        return CapturedFrame(raw, captured_at=captured_at, pool=self.pool if pooled else None)
+
+    def run(self):
+        cap = self._open()
+        self._running = True
+        try:
+            while self._running:
+                ok = self._grab_freshest(cap)
+                captured_at = time.monotonic()
+                if ok:
+                    ok, raw, pooled = self._retrieve(cap)
+                if not ok:
+                    # cámara no disponible o desconectada: no girar en vacío
+                    self.msleep(30)
+                    continue
+                frame = self._to_frame(raw, captured_at, pooled)
+                if frame is not None and self.slot.put(frame):
+                    self.frame_ready.emit()
+        finally:
+            cap.release()
+
+    def stop(self):
+        """Detiene el hilo y espera a que libere la cámara."""
+        self._running = False
+        if self.isRunning():
+            self.wait(2000)
+        self.slot.clear()
+
+
+class ProcessCaptureWorker(CaptureWorker):
+    """Variante de CaptureWorker que captura y codifica en un proceso aparte.
+
+    El proceso hijo (frame_ring.capture_process_main) escribe píxeles y JPEG en un FrameRing
+    de memoria compartida y avisa cada seq por un Pipe. Este hilo sólo espera esos avisos y
+    publica en el FrameSlot un CapturedFrame cuya imagen es una vista sin copia del anillo,
+    junto con el JPEG ya codificado. Si el hijo deja de mandar frames por `stall_timeout`
+    segundos (driver colgado), se lo termina y se lanza otro.
+    """
+
+    def __init__(self, device=0, slots: int = 8, max_width: int = 1920, max_height: int = 1080,
+                 jpeg_quality: int = 90, buffer_size: int = 1, stall_timeout: float = 5.0, parent=None):
+        super().__init__(device, buffer_size=buffer_size, parent=parent)
+        from frame_ring import FrameRing
+        self.ring = FrameRing(slots=slots, max_width=max_width, max_height=max_height)
+        self.jpeg_quality = jpeg_quality
+        self.stall_timeout = stall_timeout
+        self.restarts = 0
+
+    def _spawn(self):
+        import multiprocessing as mp
+        from frame_ring import capture_process_main
+
+        ctx = mp.get_context("spawn")
+        recv_conn, send_conn = ctx.Pipe(duplex=False)
+        stop_event = ctx.Event()
+        proc = ctx.Process(
+            target=capture_process_main,
+            args=(self.ring.params(), self.device, send_conn, stop_event, self.jpeg_quality, self.buffer_size),
+            name="heimlich-capture",
+            daemon=True,
+        )
+        proc.start()
+        send_conn.close()
+        return proc, recv_conn, stop_event
+
+    @staticmethod
+    def _terminate(proc, conn, stop_event, timeout: float = 2.0):
+        stop_event.set()
+        proc.join(timeout)
+        if proc.is_alive():
+            proc.terminate()
+            proc.join(timeout)
+        conn.close()
+
+    def run(self):
+        self._running = True
+        proc, conn, stop_event = self._spawn()
+        last_frame = time.monotonic()
+        try:
+            while self._running:
+                try:
+                    if not conn.poll(0.1):
+                        if time.monotonic() - last_frame > self.stall_timeout:
+                            log.warning("[CAPTURA] El proceso de captura no responde; reiniciándolo.")
+                            self._terminate(proc, conn, stop_event)
+                            proc, conn, stop_event = self._spawn()
+                            self.restarts += 1
+                            last_frame = time.monotonic()
+                        continue
+                    # quedarse sólo con el aviso más nuevo
+                    seq = conn.recv()
+                    while conn.poll():
+                        seq = conn.recv()
+                        self.drained += 1
+                except (EOFError, OSError):
+                    log.warning("[CAPTURA] El proceso de captura terminó; relanzándolo.")
+                    self._terminate(proc, conn, stop_event)
+                    self.msleep(500)
+                    proc, conn, stop_event = self._spawn()
+                    self.restarts += 1
+                    last_frame = time.monotonic()
+                    continue
+                last_frame = time.monotonic()
+                data = self.ring.read(seq)
+                if data is None:
+                    continue
+                image, jpeg, captured_at = data
+                if self.slot.put(CapturedFrame(image, jpeg, captured_at, seq=seq, ring=self.ring)):
+                    self.frame_ready.emit()
+        finally:
+            self._terminate(proc, conn, stop_event)
+
+    def close(self):
+        """Liberar el anillo (llamar al cerrar la app, sin vistas del anillo en uso)."""
+        self.stop()
+        self.ring.close(unlink=True)
@@ -0,0 +1,190 @@
+# src/config.py
+# Parámetros de la aplicación. Cada valor puede sobreescribirse con una variable
+# de entorno HEIMLICH_<NOMBRE> (por ejemplo HEIMLICH_INFERENCE_WORKERS=4).
+import logging
+import os
+
+log = logging.getLogger(__name__)
+
+
+def _env(name: str, default, cast=None):
+    """Lee HEIMLICH_<name> del entorno convirtiéndolo al tipo del valor por defecto."""
+    raw = os.environ.get(f"HEIMLICH_{name}")
+    if raw is None:
+        return default
+    cast = cast or type(default)
+    if cast is bool:
+        return raw.strip().lower() in ("1", "true", "si", "sí", "yes", "on")
+    try:
+        return cast(raw)
+    except ValueError:
+        log.warning(f"[CONFIG] Valor inválido para HEIMLICH_{name}: {raw!r}; se usa {default!r}")
+        return default
+
+
+# --- Captura ---
+# Pedir MJPEG a la cámara y usar su JPEG sin decodificar/recodificar (sólo se decodifica la vista previa)
+CAPTURE_MJPEG = _env("CAPTURE_MJPEG", False)
+# Reducción al decodificar la vista previa MJPEG: 1, 2, 4 u 8
+CAPTURE_MJPEG_PREVIEW_REDUCTION = _env("CAPTURE_MJPEG_PREVIEW_REDUCTION", 2)
+# Frames que OpenCV puede tener encolados (CAP_PROP_BUFFERSIZE); 0 = no tocar
+CAPTURE_BUFFER_SIZE = _env("CAPTURE_BUFFER_SIZE", 1)
+# Capturar y codificar en un proceso aparte que escribe en un anillo de memoria compartida
+CAPTURE_PROCESS = _env("CAPTURE_PROCESS", False)
+CAPTURE_RING_SLOTS = _env("CAPTURE_RING_SLOTS", 8)
+# Resolución máxima que entra en cada slot del anillo
+CAPTURE_MAX_WIDTH = _env("CAPTURE_MAX_WIDTH", 1920)
+CAPTURE_MAX_HEIGHT = _env("CAPTURE_MAX_HEIGHT", 1080)
+CAPTURE_PROCESS_JPEG_QUALITY = _env("CAPTURE_PROCESS_JPEG_QUALITY", 90)
+
+# --- Inferencia ---
+# Hilos que envían frames al servidor en paralelo
+INFERENCE_WORKERS = _env("INFERENCE_WORKERS", 2)
+# Máximo de frames en vuelo (en cola + enviándose)
+INFERENCE_MAX_IN_FLIGHT = _env("INFERENCE_MAX_IN_FLIGHT", 4)
+# Qué descartar al llegar al máximo: "oldest" (el más viejo en cola) o "newest" (el que llega)
+INFERENCE_DROP_POLICY = _env("INFERENCE_DROP_POLICY", "oldest")
+
+# --- Servidor de predicción ---
+PREDICT_URL = _env("PREDICT_URL", "http://127.0.0.1:8000/predictOne")
+# Tiempos en segundos; el deadline acota el pedido completo incluyendo reintentos
+PREDICT_CONNECT_TIMEOUT = _env("PREDICT_CONNECT_TIMEOUT", 3.0)
+PREDICT_READ_TIMEOUT = _env("PREDICT_READ_TIMEOUT", 10.0)
+PREDICT_DEADLINE = _env("PREDICT_DEADLINE", 10.0)
+# Reintentos ante errores transitorios (conexión, timeout, 502/503/504) con backoff con jitter
+PREDICT_RETRIES = _env("PREDICT_RETRIES", 2)
+PREDICT_BACKOFF_BASE = _env("PREDICT_BACKOFF_BASE", 0.1)
+PREDICT_BACKOFF_MAX = _env("PREDICT_BACKOFF_MAX", 1.0)
+# Cómo viaja el JPEG: "json" (base64 en JSON, el formato de siempre), "octet" (bytes crudos)
+# o "multipart". Los binarios se activan a mano una vez que el servidor los soporta; si los
+# rechaza (400/415/422) se vuelve solo a "json".
+PREDICT_TRANSPORT = _env("PREDICT_TRANSPORT", "json")
+# Lotes para /predictBatch: 1 = desactivado (un pedido por frame a PREDICT_URL)
+PREDICT_BATCH_URL = _env("PREDICT_BATCH_URL", "http://127.0.0.1:8000/predictBatch")
+PREDICT_BATCH_SIZE = _env("PREDICT_BATCH_SIZE", 1)
+# Espera máxima para completar un lote, contada desde el frame más viejo
+PREDICT_BATCH_INTERVAL_MS = _env("PREDICT_BATCH_INTERVAL_MS", 100)
+
+# --- Modo de inferencia ---
+# "http": un pedido por frame (o por lote) a PREDICT_URL desde el pool de inferencia
+# "stream": canal WebSocket persistente a PREDICT_STREAM_URL, un frame por cada frame de cámara
+# "local": servidor en la misma máquina por socket Unix (o host:puerto) y memoria compartida
+# "onnx": modelo en proceso con ONNX Runtime (CPU); "mock": predicción fija, sin servidor
+PREDICT_MODE = _env("PREDICT_MODE", "http")
+PREDICT_STREAM_URL = _env("PREDICT_STREAM_URL", "ws://127.0.0.1:8000/predictStream")
+
+# Servidor local (PREDICT_MODE=local): ruta de socket Unix, o "host:puerto" donde no hay AF_UNIX
+LOCAL_ADDRESS = _env("LOCAL_ADDRESS", "/tmp/heimlich-predict.sock")
+# Pasar el JPEG por memoria compartida y mandar por el socket sólo la referencia al slot
+LOCAL_USE_SHM = _env("LOCAL_USE_SHM", False)
+LOCAL_SHM_SLOTS = _env("LOCAL_SHM_SLOTS", 8)
+LOCAL_SHM_SLOT_SIZE = _env("LOCAL_SHM_SLOT_SIZE", 1 << 20)
+
+# Backend ONNX en proceso (PREDICT_MODE=onnx)
+ONNX_MODEL_PATH = _env("ONNX_MODEL_PATH", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                                       "models", "model.onnx"))
+# Etiquetas por índice de salida separadas por comas; vacío = usar la metadata "labels" del modelo
+ONNX_LABELS = _env("ONNX_LABELS", "")
+# Hilos de ONNX Runtime por inferencia (0 = lo que decida ONNX Runtime)
+ONNX_THREADS = _env("ONNX_THREADS", 0)
+
+# Backend falso (PREDICT_MODE=mock): predicciones que devuelve en ciclo y demora simulada
+MOCK_PREDICTIONS = _env("MOCK_PREDICTIONS", "correcta")
+MOCK_DELAY_MS = _env("MOCK_DELAY_MS", 0)
+
+# --- Filtro de frames similares ---
+# No enviar frames cuya diferencia absoluta media (0-255, sobre una miniatura en grises)
+# con el último enviado sea menor al umbral; se reutiliza la predicción anterior.
+GATE_ENABLED = _env("GATE_ENABLED", True)
+GATE_THRESHOLD = _env("GATE_THRESHOLD", 2.0)
+# Máximo de frames seguidos que se pueden saltear antes de forzar un envío
+GATE_MAX_SKIP = _env("GATE_MAX_SKIP", 10)
+
+# --- Preprocesamiento antes de codificar ---
+# Región del alumno: "none", "fixed" (PREPROCESS_ROI), "calibrated" (archivo de calibración)
+# o "detect" (Haar cascade de torso de OpenCV)
+PREPROCESS_ROI_MODE = _env("PREPROCESS_ROI_MODE", "none")
+# ROI fija como fracciones del frame "x,y,w,h" (por ejemplo "0.2,0.1,0.6,0.9")
+PREPROCESS_ROI = _env("PREPROCESS_ROI", "")
+PREPROCESS_CALIBRATION_PATH = _env("PREPROCESS_CALIBRATION_PATH", os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "calibration.json"))
+# Resolución de entrada del modelo "ANCHOxALTO"; vacío = no redimensionar
+PREPROCESS_MODEL_SIZE = _env("PREPROCESS_MODEL_SIZE", "")
+
+# --- Calidad JPEG adaptativa ---
+# Bajar/subir la calidad JPEG para mantener el p95 de latencia de predicción bajo el objetivo
+QUALITY_ADAPTIVE = _env("QUALITY_ADAPTIVE", True)
+QUALITY_TARGET_P95_MS = _env("QUALITY_TARGET_P95_MS", 250.0)
+QUALITY_MIN = _env("QUALITY_MIN", 50)
+QUALITY_MAX = _env("QUALITY_MAX", 90)
+QUALITY_INITIAL = _env("QUALITY_INITIAL", 90)
+QUALITY_STEP = _env("QUALITY_STEP", 5)
+# Resultados por ventana de medición
+QUALITY_WINDOW = _env("QUALITY_WINDOW", 10)
+# Si la calidad ya está en el mínimo, bajar también la resolución (1.0 -> 0.75 -> 0.5)
+QUALITY_ADAPT_SCALE = _env("QUALITY_ADAPT_SCALE", False)
+
+# --- Escritura de la sesión en disco ---
+# Frames que pueden esperar en la cola del escritor antes de aplicar contrapresión
+WRITER_MAX_QUEUE = _env("WRITER_MAX_QUEUE", 64)
+# Cuánto puede esperar el GUI por lugar en la cola antes de descartar el frame
+WRITER_BACKPRESSURE_MS = _env("WRITER_BACKPRESSURE_MS", 5)
+# fsync: "none", "session" (al terminar la sesión) o "frame" (cada archivo)
+WRITER_FSYNC = _env("WRITER_FSYNC", "session")
+# Formato de la sesión: "container" (frames.bin + frames.idx) o "files" (un .jpg por frame)
+SESSION_STORAGE = _env("SESSION_STORAGE", "container")
+
+# --- Historial de sesiones ---
+# Indexar cada sesión terminada en captures/index.db (SQLite) para consultar el historial
+SESSION_INDEX_ENABLED = _env("SESSION_INDEX_ENABLED", True)
+
+# --- Retención de captures/ ---
+# Mantenimiento en un proceso aparte con prioridad baja (al iniciar, cada intervalo y al terminar una sesión).
+# Por defecto sólo archiva: el borrado (edad o tope de espacio) lo habilita cada instalación.
+RETENTION_ENABLED = _env("RETENTION_ENABLED", True)
+RETENTION_INTERVAL_MIN = _env("RETENTION_INTERVAL_MIN", 60)
+# Borrar sesiones y archivos más viejos que esto (0 = nunca)
+RETENTION_MAX_AGE_DAYS = _env("RETENTION_MAX_AGE_DAYS", 0.0)
+# Tope de espacio de captures/; al superarlo se borra desde lo más viejo (0 = sin tope)
+RETENTION_MAX_GB = _env("RETENTION_MAX_GB", 0.0)
+# Dejar sólo los frames "correcta" de las sesiones con más de RETENTION_COMPACT_AFTER_DAYS días
+RETENTION_KEEP_ONLY_CORRECT = _env("RETENTION_KEEP_ONLY_CORRECT", False)
+RETENTION_COMPACT_AFTER_DAYS = _env("RETENTION_COMPACT_AFTER_DAYS", 1.0)
+# Empaquetar en captures/archive/<sesión>.zip las sesiones con más de estos días (0 = no archivar)
+RETENTION_ARCHIVE_AFTER_DAYS = _env("RETENTION_ARCHIVE_AFTER_DAYS", 7.0)
+
+# --- Log ---
+# Nivel de la consola y del archivo JSON (captures/logs/heimlich.jsonl). Con DEBUG se ve cada
+# predicción y cada envío; con ERROR se silencian también los errores por frame
+LOG_LEVEL = _env("LOG_LEVEL", "INFO")
+LOG_FILE_LEVEL = _env("LOG_FILE_LEVEL", "INFO")
+# Rotación por tamaño y cantidad de archivos viejos que se conservan
+LOG_MAX_BYTES = _env("LOG_MAX_BYTES", 5 * 2**20)
+LOG_BACKUPS = _env("LOG_BACKUPS", 5)
+# Registros que el hilo del log escribe por lote (un solo flush por lote)
+LOG_BATCH_SIZE = _env("LOG_BATCH_SIZE", 256)
+
+# --- Frames en RAM ---
+# Los frames que el filtro no manda a predecir quedan crudos en un anillo en RAM (sin codificar
+# ni escribir); sólo se codifican si son la foto final o si se exporta la sesión
+SESSION_STORE_ENABLED = _env("SESSION_STORE_ENABLED", True)
+# Memoria reservada para el anillo y reducción de los frames guardados (1.0 = tamaño original)
+SESSION_STORE_MB = _env("SESSION_STORE_MB", 256)
+SESSION_STORE_SCALE = _env("SESSION_STORE_SCALE", 1.0)
+# Al terminar la sesión, codificar y guardar también los frames que siguen en el anillo
+SESSION_STORE_EXPORT = _env("SESSION_STORE_EXPORT", False)
+SESSION_STORE_JPEG_QUALITY = _env("SESSION_STORE_JPEG_QUALITY", 90)
+
+# --- Spool de frames sin predicción ---
+# Los frames que fallaron (o quedaron sin enviar al cerrar la sesión) se guardan en captures/spool
+# y se reenvían en segundo plano cuando el servidor vuelve; se corrige la sesión y su puntaje
+SPOOL_ENABLED = _env("SPOOL_ENABLED", True)
+# Frames por segundo al vaciar el spool (para no saturar al servidor con la cola acumulada)
+SPOOL_REPLAY_RATE = _env("SPOOL_REPLAY_RATE", 2.0)
+# Espera entre intentos con el servidor caído: se duplica desde el mínimo hasta el máximo
+SPOOL_RETRY_MIN_S = _env("SPOOL_RETRY_MIN_S", 5.0)
+SPOOL_RETRY_MAX_S = _env("SPOOL_RETRY_MAX_S", 300.0)
+# Respuestas sin predicción que se toleran por frame antes de abandonarlo (con el servidor caído no cuentan)
+SPOOL_MAX_ATTEMPTS = _env("SPOOL_MAX_ATTEMPTS", 20)
+# Tope de espacio del spool; al superarlo se descartan los frames más viejos
+SPOOL_MAX_MB = _env("SPOOL_MAX_MB", 500)
@@ -0,0 +1,166 @@
+# src/frame_ring.py
+import logging
+import time
+from multiprocessing import shared_memory
+
+import cv2
+import numpy as np
+
+log = logging.getLogger(__name__)
+
+# Cabecera de cada slot. seq = 0 mientras el escritor lo está llenando.
+SLOT_HEADER = np.dtype([
+    ("seq", "<u8"),
+    ("captured_at", "<f8"),
+    ("h", "<u4"),
+    ("w", "<u4"),
+    ("jpeg_len", "<u4"),
+    ("pad", "<u4"),
+])
+_GLOBAL_HEADER_SIZE = 64   # último seq publicado (u8) + relleno
+
+
+class FrameRing:
+    """Anillo de frames en multiprocessing.shared_memory con números de secuencia.
+
+    Layout: [último seq][cabeceras de N slots][píxeles BGR de N slots][JPEG de N slots].
+    Un solo escritor (el proceso de captura) llena el slot seq % N, y al final escribe el
+    seq en la cabecera del slot y en la global. El lector toma vistas sin copia de los
+    píxeles; como el escritor recién vuelve a ese slot N frames después, hay margen para
+    usarlas, y `is_current(seq)` permite verificar que el slot no se haya pisado.
+    """
+
+    def __init__(self, name: str = None, create: bool = True, slots: int = 8,
+                 max_width: int = 1920, max_height: int = 1080, max_jpeg: int = 1 << 20):
+        self.slots = slots
+        self.max_width = max_width
+        self.max_height = max_height
+        self.max_jpeg = max_jpeg
+        self.pixel_bytes = max_width * max_height * 3
+        size = (_GLOBAL_HEADER_SIZE + slots * SLOT_HEADER.itemsize
+                + slots * self.pixel_bytes + slots * max_jpeg)
+        if create:
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        buf = self.shm.buf
+        self._latest = np.ndarray((1,), dtype="<u8", buffer=buf, offset=0)
+        self.headers = np.ndarray((slots,), dtype=SLOT_HEADER, buffer=buf, offset=_GLOBAL_HEADER_SIZE)
+        self._pixels_offset = _GLOBAL_HEADER_SIZE + slots * SLOT_HEADER.itemsize
+        self._jpeg_offset = self._pixels_offset + slots * self.pixel_bytes
+        if create:
+            self._latest[0] = 0
+            self.headers["seq"] = 0
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def params(self) -> dict:
+        """Argumentos para abrir el mismo anillo desde otro proceso."""
+        return {"name": self.name, "create": False, "slots": self.slots, "max_width": self.max_width,
+                "max_height": self.max_height, "max_jpeg": self.max_jpeg}
+
+    def latest(self) -> int:
+        return int(self._latest[0])
+
+    def pixels(self, slot: int, h: int, w: int):
+        return np.ndarray((h, w, 3), dtype=np.uint8, buffer=self.shm.buf,
+                          offset=self._pixels_offset + slot * self.pixel_bytes)
+
+    def jpeg(self, slot: int):
+        return np.ndarray((self.max_jpeg,), dtype=np.uint8, buffer=self.shm.buf,
+                          offset=self._jpeg_offset + slot * self.max_jpeg)
+
+    # --- escritor ---
+    def begin(self, seq: int) -> int:
+        slot = seq % self.slots
+        self.headers[slot]["seq"] = 0
+        return slot
+
+    def commit(self, slot: int, seq: int, captured_at: float, h: int, w: int, jpeg_len: int):
+        hdr = self.headers[slot]
+        hdr["captured_at"] = captured_at
+        hdr["h"] = h
+        hdr["w"] = w
+        hdr["jpeg_len"] = jpeg_len
+        hdr["seq"] = seq
+        self._latest[0] = seq
+
+    # --- lector ---
+    def is_current(self, seq: int) -> bool:
+        return int(self.headers[seq % self.slots]["seq"]) == seq
+
+    def read(self, seq: int):
+        """Devuelve (vista BGR sin copia, bytes del JPEG, captured_at) o None si el slot ya cambió."""
+        slot = seq % self.slots
+        hdr = self.headers[slot]
+        if int(hdr["seq"]) != seq:
+            return None
+        h, w, n = int(hdr["h"]), int(hdr["w"]), int(hdr["jpeg_len"])
+        captured_at = float(hdr["captured_at"])
+        jpeg = self.jpeg(slot)[:n].tobytes() if n else None
+        if not self.is_current(seq):
+            return None
+        return self.pixels(slot, h, w), jpeg, captured_at
+
+    def close(self, unlink: bool = False):
+        # las vistas numpy tienen que soltarse antes de cerrar el segmento
+        self._latest = None
+        self.headers = None
+        try:
+            self.shm.close()
+        except BufferError:
+            log.warning("[RING] Quedan vistas abiertas del anillo; no se cierra el segmento")
+            return
+        if unlink:
+            self.shm.unlink()
+
+
+def capture_process_main(ring_params: dict, device, conn, stop_event, jpeg_quality: int = 90,
+                         buffer_size: int = 1):
+    """Proceso de captura y codificación: escribe cada frame (píxeles + JPEG) en el anillo y
+    avisa el seq por `conn`. Corre en otro proceso, así no comparte el GIL con el GUI y un
+    driver colgado no congela la interfaz."""
+    ring = FrameRing(**ring_params)
+    cap = cv2.VideoCapture(device)
+    if buffer_size:
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, buffer_size)
+    params = [int(cv2.IMWRITE_JPEG_QUALITY), jpeg_quality]
+    seq = 0
+    shape = None
+    img = view = dst = None
+    try:
+        while not stop_event.is_set():
+            if not cap.grab():
+                time.sleep(0.03)
+                continue
+            captured_at = time.monotonic()
+            slot = ring.begin(seq + 1)
+            if shape is not None:
+                dst = ring.pixels(slot, *shape)
+                ok, img = cap.retrieve(dst)
+            else:
+                ok, img = cap.retrieve()
+            if not ok:
+                continue
+            h, w = img.shape[:2]
+            if h > ring.max_height or w > ring.max_width:
+                log.warning(f"[RING] Frame {w}x{h} no entra en el anillo ({ring.max_width}x{ring.max_height})")
+                time.sleep(1)
+                continue
+            view = ring.pixels(slot, h, w)
+            if img.ctypes.data != view.ctypes.data:
+                view[...] = img   # primer frame o cambio de resolución
+            shape = (h, w)
+            ok, buf = cv2.imencode(".jpg", view, params)
+            n = len(buf) if ok and len(buf) <= ring.max_jpeg else 0
+            if n:
+                ring.jpeg(slot)[:n] = buf.reshape(-1)
+            seq += 1
+            ring.commit(slot, seq, captured_at, h, w, n)
+            conn.send(seq)
+    finally:
+        cap.release()
+        img = view = dst = None
+        ring.close()
@@ -0,0 +1,88 @@
+# src/frame_store.py
+import cv2
+import numpy as np
+
+
+class FrameStore:
+    """Anillo en RAM con los frames BGR de la sesión, sin codificar.
+
+    El arreglo se reserva una sola vez (en el primer put, cuando se conoce el tamaño del
+    frame) con tantos slots como entren en `budget_bytes`. Cuando se llena se pisa el más
+    viejo, salvo el frame fijado con pin() (la última foto correcta). El JPEG se genera
+    recién cuando alguien lo pide con encode(). Lo usa sólo el hilo del GUI.
+    """
+
+    def __init__(self, budget_bytes: int, scale: float = 1.0):
+        self.budget = budget_bytes
+        self.scale = scale
+        self._frames = None
+        self._seqs = None            # seq guardado en cada slot (-1 = vacío)
+        self._slot_of = {}           # seq -> slot
+        self._next = 0
+        self.pinned = None
+        self.evicted = 0
+
+    @property
+    def slots(self) -> int:
+        return 0 if self._frames is None else len(self._frames)
+
+    def _allocate(self, h: int, w: int):
+        slots = max(2, self.budget // (h * w * 3))
+        self._frames = np.empty((slots, h, w, 3), dtype=np.uint8)
+        self._seqs = np.full(slots, -1, dtype=np.int64)
+        self._slot_of = {}
+        self._next = 0
+        self.pinned = None
+
+    def put(self, seq: int, frame_bgr):
+        """Copia (y reduce, si corresponde) el frame al slot siguiente."""
+        h, w = frame_bgr.shape[:2]
+        if self.scale != 1.0:
+            h, w = max(1, int(h * self.scale)), max(1, int(w * self.scale))
+        if self._frames is None or self._frames.shape[1:3] != (h, w):
+            # cambió la resolución de la cámara: se vuelve a reservar y se pierde lo guardado
+            self._allocate(h, w)
+        slot = self._next
+        if self.pinned is not None and self._seqs[slot] == self.pinned:
+            slot = (slot + 1) % len(self._frames)
+        old = int(self._seqs[slot])
+        if old >= 0:
+            del self._slot_of[old]
+            self.evicted += 1
+        if self.scale != 1.0:
+            cv2.resize(frame_bgr, (w, h), dst=self._frames[slot], interpolation=cv2.INTER_AREA)
+        else:
+            np.copyto(self._frames[slot], frame_bgr)
+        self._seqs[slot] = seq
+        self._slot_of[seq] = slot
+        self._next = (slot + 1) % len(self._frames)
+
+    def get(self, seq: int):
+        """Vista del frame guardado (válida hasta que se pise el slot) o None si ya no está."""
+        slot = self._slot_of.get(seq)
+        return None if slot is None else self._frames[slot]
+
+    def pin(self, seq: int):
+        """Proteger un frame de ser pisado (uno solo a la vez)."""
+        self.pinned = seq if seq in self._slot_of else None
+
+    def encode(self, seq: int, quality: int = 90):
+        """JPEG del frame guardado, o None si ya no está en el anillo."""
+        frame = self.get(seq)
+        if frame is None:
+            return None
+        ok, buf = cv2.imencode(".jpg", frame, [int(cv2.IMWRITE_JPEG_QUALITY), quality])
+        return buf.tobytes() if ok else None
+
+    def seqs(self) -> list:
+        """Secuencias que siguen en el anillo, de la más vieja a la más nueva."""
+        return sorted(self._slot_of)
+
+    def clear(self):
+        """Olvidar los frames (el arreglo se conserva para la próxima sesión)."""
+        if self._seqs is not None:
+            self._seqs.fill(-1)
+        self._slot_of = {}
+        self._next = 0
+        self.pinned = None
+        self.evicted = 0
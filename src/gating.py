@@ -0,0 +1,51 @@
+# src/gating.py
+import cv2
+import numpy as np
+
+
+class FrameGate:
+    """Filtro barato para no mandar a predecir frames casi iguales al último enviado.
+
+    Compara una miniatura en escala de grises del frame con la del último frame enviado
+    usando la diferencia absoluta media (0-255). Por debajo de `threshold` el frame se
+    considera igual y se puede reutilizar la predicción anterior. Cada `max_skip` frames
+    salteados seguidos se fuerza un envío para no quedar pegados a una predicción vieja.
+    """
+
+    def __init__(self, threshold: float = 2.0, size=(32, 24), max_skip: int = 10):
+        self.threshold = threshold
+        self.size = size
+        self.max_skip = max_skip
+        self._ref = None
+        self._thumb = np.empty((size[1], size[0]), dtype=np.uint8)
+        self._skipped_run = 0
+        self.sent = 0
+        self.skipped = 0
+
+    def _thumbnail(self, frame_bgr):
+        small = cv2.resize(frame_bgr, self.size, interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY, dst=self._thumb)
+
+    def difference(self, frame_bgr) -> float:
+        """Diferencia absoluta media contra el último frame enviado (inf si no hay referencia)."""
+        if self._ref is None:
+            return float("inf")
+        thumb = self._thumbnail(frame_bgr)
+        return cv2.norm(thumb, self._ref, cv2.NORM_L1) / thumb.size
+
+    def should_send(self, frame_bgr, force: bool = False) -> bool:
+        """True si el frame hay que enviarlo (y pasa a ser la nueva referencia)."""
+        if not force and self._skipped_run < self.max_skip and self.difference(frame_bgr) < self.threshold:
+            self._skipped_run += 1
+            self.skipped += 1
+            return False
+        self._ref = self._thumbnail(frame_bgr).copy()
+        self._skipped_run = 0
+        self.sent += 1
+        return True
+
+    def reset(self):
+        self._ref = None
+        self._skipped_run = 0
+        self.sent = 0
+        self.skipped = 0
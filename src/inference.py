@@ -0,0 +1,148 @@
+# src/inference.py
+import threading
+import time
+from collections import deque
+
+from PySide6.QtCore import QObject, Signal
+
+DROP_OLDEST = "oldest"
+DROP_NEWEST = "newest"
+
+
+class InferenceDispatcher(QObject):
+    """Envía frames a predecir desde un pool de hilos, con un máximo de pedidos en vuelo.
+
+    `predict_fn(payload)` se ejecuta en los hilos del pool y debe devolver el dict de
+    post_request. El resultado vuelve al hilo del GUI con la señal `result_ready(job, result)`.
+    Al llegar a `max_in_flight`, la política decide si se descarta el pedido más viejo que
+    todavía no empezó ("oldest") o el que acaba de llegar ("newest").
+
+    Si se pasa `batch_fn` y `batch_size` > 1, los hilos agrupan hasta `batch_size` pedidos
+    o lo que se haya juntado en `batch_interval_ms` desde el más viejo, y llaman a
+    `batch_fn([(job, payload), ...])`, que debe devolver una lista de resultados en el mismo orden.
+    """
+
+    result_ready = Signal(object, object)
+
+    def __init__(self, predict_fn, workers: int = 2, max_in_flight: int = 4,
+                 drop_policy: str = DROP_OLDEST, batch_fn=None, batch_size: int = 1,
+                 batch_interval_ms: int = 100, parent=None):
+        super().__init__(parent)
+        if drop_policy not in (DROP_OLDEST, DROP_NEWEST):
+            raise ValueError(f"Política de descarte desconocida: {drop_policy}")
+        self.predict_fn = predict_fn
+        self.drop_policy = drop_policy
+        self.batch_fn = batch_fn
+        self.batch_size = max(1, batch_size) if batch_fn is not None else 1
+        self.batch_interval = batch_interval_ms / 1000
+        # con lotes tiene que caber al menos un lote completo en vuelo
+        self.max_in_flight = max(1, max_in_flight, self.batch_size)
+
+        self._cond = threading.Condition()
+        self._pending = deque()
+        self._running = 0
+        self._closed = False
+        self.submitted = 0
+        self.dropped = 0
+        self.completed = 0
+
+        self._threads = []
+        for i in range(max(1, workers)):
+            t = threading.Thread(target=self._worker, name=f"inference-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def submit(self, job, payload):
+        """Encola un pedido. Devuelve el (job, payload) que quedó descartado (el más viejo o el
+        nuevo, según la política) o None, por si hay que guardarlo para más tarde."""
+        with self._cond:
+            if self._closed:
+                return job, payload
+            self.submitted += 1
+            dropped = None
+            if len(self._pending) + self._running >= self.max_in_flight:
+                self.dropped += 1
+                if self.drop_policy == DROP_OLDEST and self._pending:
+                    dropped = self._pending.popleft()[:2]
+                else:
+                    return job, payload
+            self._pending.append((job, payload, time.monotonic()))
+            self._cond.notify()
+        return dropped
+
+    def in_flight(self) -> int:
+        with self._cond:
+            return len(self._pending) + self._running
+
+    def clear_pending(self) -> list:
+        """Descarta los pedidos que todavía no empezaron (por ejemplo al terminar la sesión).
+
+        Devuelve los (job, payload) descartados, por si hay que guardarlos para más tarde.
+        """
+        with self._cond:
+            self.dropped += len(self._pending)
+            discarded = [(job, payload) for job, payload, _ in self._pending]
+            self._pending.clear()
+        return discarded
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {"submitted": self.submitted, "dropped": self.dropped,
+                    "completed": self.completed, "in_flight": len(self._pending) + self._running}
+
+    def reset_stats(self):
+        with self._cond:
+            self.submitted = 0
+            self.dropped = 0
+            self.completed = 0
+
+    def shutdown(self):
+        with self._cond:
+            self._closed = True
+            self._pending.clear()
+            self._cond.notify_all()
+
+    def _next_batch(self):
+        """Espera (con el lock tomado) a tener un lote listo. Devuelve None al cerrar."""
+        while True:
+            while not self._pending and not self._closed:
+                self._cond.wait()
+            if self._closed:
+                return None
+            # juntar hasta batch_size o hasta que venza la ventana del pedido más viejo
+            while self.batch_size > 1 and len(self._pending) < self.batch_size and not self._closed:
+                remaining = self._pending[0][2] + self.batch_interval - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+                if not self._pending:
+                    break
+            if self._closed:
+                return None
+            if not self._pending:
+                # otro hilo se llevó el lote mientras esperábamos
+                continue
+            n = min(self.batch_size, len(self._pending))
+            batch = [self._pending.popleft()[:2] for _ in range(n)]
+            self._running += n
+            return batch
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                batch = self._next_batch()
+            if batch is None:
+                return
+            try:
+                if self.batch_size > 1:
+                    results = self.batch_fn(batch)
+                else:
+                    results = [self.predict_fn(batch[0][1])]
+            except Exception as e:
+                results = [{"error": str(e)}] * len(batch)
+            finally:
+                with self._cond:
+                    self._running -= len(batch)
+                    self.completed += len(batch)
+            for (job, _), result in zip(batch, results):
+                self.result_ready.emit(job, result)
@@ -0,0 +1,190 @@
+# src/local_transport.py
+import itertools
+import json
+import logging
+import socket
+import struct
+import threading
+from multiprocessing import shared_memory
+from queue import Empty, Queue
+
+from predictors import Predictor
+
+log = logging.getLogger(__name__)
+
+# Protocolo: pedido = REQUEST_HEADER (tipo, seq, largo) + payload; respuesta = REPLY_HEADER + JSON.
+# Tipo KIND_INLINE: el payload es el JPEG. Tipo KIND_SHM: el payload es SHM_REF (offset, largo)
+# seguido del nombre del segmento de memoria compartida donde está el JPEG.
+KIND_INLINE = 0
+KIND_SHM = 1
+REQUEST_HEADER = struct.Struct(">BQI")
+SHM_REF = struct.Struct(">QI")
+REPLY_HEADER = struct.Struct(">I")
+
+
+def parse_address(address: str):
+    """'host:puerto' -> TCP (sirve en Windows, sin AF_UNIX); cualquier otra cosa -> ruta de socket Unix."""
+    if ":" in address and not address.startswith("/"):
+        host, port = address.rsplit(":", 1)
+        return socket.AF_INET, (host, int(port))
+    if not hasattr(socket, "AF_UNIX"):
+        raise RuntimeError("Este sistema no tiene sockets Unix; usar una dirección 'host:puerto'")
+    return socket.AF_UNIX, address
+
+
+def recv_exact(sock: socket.socket, n: int) -> bytes:
+    buf = bytearray(n)
+    view = memoryview(buf)
+    got = 0
+    while got < n:
+        r = sock.recv_into(view[got:])
+        if r == 0:
+            raise ConnectionError("Conexión cerrada por el otro extremo")
+        got += r
+    return bytes(buf)
+
+
+def read_request(sock: socket.socket):
+    kind, seq, length = REQUEST_HEADER.unpack(recv_exact(sock, REQUEST_HEADER.size))
+    return kind, seq, recv_exact(sock, length)
+
+
+def send_reply(sock: socket.socket, body: dict):
+    data = json.dumps(body).encode("utf-8")
+    sock.sendall(REPLY_HEADER.pack(len(data)) + data)
+
+
+class SharedMemoryRing:
+    """Anillo de slots de tamaño fijo sobre multiprocessing.shared_memory.
+
+    El proceso que lo crea toma un slot libre con acquire(), copia el JPEG con write()
+    y pasa sólo (offset, largo, nombre) al otro proceso. release() devuelve el slot.
+    """
+
+    def __init__(self, name: str = None, slots: int = 8, slot_size: int = 1 << 20):
+        self.slots = slots
+        self.slot_size = slot_size
+        self.shm = shared_memory.SharedMemory(name=name, create=True, size=slots * slot_size)
+        self._free = Queue()
+        for i in range(slots):
+            self._free.put(i)
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def acquire(self, timeout: float = None) -> int:
+        try:
+            return self._free.get(timeout=timeout)
+        except Empty:
+            raise TimeoutError("No hay slots libres en la memoria compartida") from None
+
+    def release(self, slot: int):
+        self._free.put(slot)
+
+    def write(self, slot: int, data: bytes) -> int:
+        """Copia data al slot y devuelve su offset dentro del segmento."""
+        if len(data) > self.slot_size:
+            raise ValueError(f"Frame de {len(data)} bytes no entra en un slot de {self.slot_size}")
+        offset = slot * self.slot_size
+        self.shm.buf[offset:offset + len(data)] = data
+        return offset
+
+    def close(self):
+        self.shm.close()
+        self.shm.unlink()
+
+
+class LocalPredictClient(Predictor):
+    """Cliente para un servidor de predicción en la misma máquina, sin HTTP.
+
+    Usa conexiones persistentes (una por hilo del pool de inferencia) a un socket Unix o,
+    donde no hay AF_UNIX, a un puerto TCP de loopback. Con `use_shm` el JPEG se copia a un
+    anillo de memoria compartida y por el socket sólo viaja la referencia al slot.
+    Devuelve los mismos dicts que PredictClient.predict().
+    """
+
+    def __init__(self, address: str, use_shm: bool = False, shm_slots: int = 8,
+                 shm_slot_size: int = 1 << 20, timeout: float = 10.0):
+        self.address = address
+        self.family, self.addr = parse_address(address)
+        self.timeout = timeout
+        self.ring = SharedMemoryRing(slots=shm_slots, slot_size=shm_slot_size) if use_shm else None
+        self._seq = itertools.count(1)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._sockets = []
+        self.requests_sent = 0
+        self.connections_opened = 0
+
+    def _socket(self) -> socket.socket:
+        sock = getattr(self._local, "sock", None)
+        if sock is None:
+            sock = socket.socket(self.family, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            sock.connect(self.addr)
+            if self.family == socket.AF_INET:
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self._local.sock = sock
+            with self._lock:
+                self._sockets.append(sock)
+                self.connections_opened += 1
+        return sock
+
+    def _drop_socket(self):
+        sock = getattr(self._local, "sock", None)
+        self._local.sock = None
+        if sock is not None:
+            with self._lock:
+                if sock in self._sockets:
+                    self._sockets.remove(sock)
+            sock.close()
+
+    def _roundtrip(self, kind: int, payload: bytes) -> dict:
+        sock = self._socket()
+        try:
+            sock.sendall(REQUEST_HEADER.pack(kind, next(self._seq), len(payload)) + payload)
+            (length,) = REPLY_HEADER.unpack(recv_exact(sock, REPLY_HEADER.size))
+            data = json.loads(recv_exact(sock, length))
+        except (OSError, ValueError):
+            self._drop_socket()
+            raise
+        with self._lock:
+            self.requests_sent += 1
+        return data
+
+    def predict(self, jpeg: bytes) -> dict:
+        try:
+            if self.ring is not None and len(jpeg) <= self.ring.slot_size:
+                slot = self.ring.acquire(timeout=self.timeout)
+                try:
+                    offset = self.ring.write(slot, jpeg)
+                    ref = SHM_REF.pack(offset, len(jpeg)) + self.ring.name.encode("utf-8")
+                    data = self._roundtrip(KIND_SHM, ref)
+                finally:
+                    self.ring.release(slot)
+            else:
+                data = self._roundtrip(KIND_INLINE, jpeg)
+        except (OSError, ValueError) as e:
+            log.warning(f"[LOCAL] Error de transporte: {e}")
+            return {"error": str(e)}
+
+        if "error" in data:
+            return {"error": data["error"], "data": data}
+        prediction = data.get("prediction")
+        if prediction is None:
+            return {"error": "Campo 'prediction' ausente", "data": data}
+        return {"prediction": prediction, "raw": data}
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"transport": "shm" if self.ring else "socket", "requests": self.requests_sent,
+                    "connections_opened": self.connections_opened}
+
+    def close(self):
+        with self._lock:
+            sockets, self._sockets = self._sockets, []
+        for sock in sockets:
+            sock.close()
+        if self.ring is not None:
+            self.ring.close()
@@ -1,13 +1,15 @@
 # src/main.py
+import logging
 import sys
 import cv2
-import base64, requests, json
+import numpy as np
+import json
 import resources_rc
 # Referencia explícita para evitar warnings de linter; resources se registran al importarlos
 _ = resources_rc
 from PySide6.QtWidgets import QApplication, QLabel, QMainWindow
 from PySide6.QtCore import QTimer
-from PySide6.QtGui import QImage, QPixmap
+from PySide6.QtGui import QPixmap
 from PySide6.QtUiTools import QUiLoader
 from PySide6.QtCore import QFile, QIODevice
 from pathlib import Path
@@ -15,6 +17,24 @@ from PySide6.QtCore import Qt
 import time
 from PySide6.QtWidgets import QApplication, QLabel, QMainWindow, QDialog, QPushButton
 import os
+from capture import CaptureWorker, ProcessCaptureWorker
+from preview import PreviewRenderer, decode_scaled, fit_pixmap, jpeg_size
+from frame_store import FrameStore
+from inference import InferenceDispatcher
+import config
+from predictors import create_predictor
+from gating import FrameGate
+from preprocess import FramePreprocessor, parse_roi, parse_size
+from quality import QualityController, percentile
+from session_writer import SessionWriter
+from session_store import SessionContainer, frame_ref
+from session_manifest import EVENT_FRAME, EVENT_RESULT, SessionManifest, wall_time
+import session_index
+from retention import RetentionService
+from spool import SPOOL_DIR, OfflineSpool
+import app_log
+
+log = logging.getLogger(__name__)
 
 
 def load_ui(path):
@@ -40,6 +60,8 @@ class CameraApp(QMainWindow):
         self.pop_up = base_dir / "ui" /"popup_window.ui"
         # Buscar el QLabel del .ui
         self.label: QLabel = self.ui.findChild(QLabel, "lblCamera")
+        # Vista previa reducida al tamaño del label con buffers reutilizados
+        self.preview = PreviewRenderer(self.label)
 
         # Qlabel que muestra el resultado de cada captura
         self.lbl_result: QLabel = self.ui.findChild(QLabel, "lblResult")
@@ -52,16 +74,94 @@ class CameraApp(QMainWindow):
         self.error_icon = QPixmap(":/icons/error.png")
         self.error_icon = self.error_icon.scaled(self.lbl_result.size(), Qt.KeepAspectRatio, Qt.SmoothTransformation)
 
-        # Inicializar la cámara (0 = webcam principal)
-        self.cap = cv2.VideoCapture(0)
-
-        # guardar último frame
+        # guardar último frame (y su JPEG original si la cámara entrega MJPEG)
         self.last_frame_bgr = None
-
-        # Crear un QTimer que actualice el frame cada 30 ms
-        self.timer = QTimer()
-        self.timer.timeout.connect(self.update_frame)
-        self.timer.start(30)
+        self.last_frame_jpeg = None
+        self.last_frame_captured_at = None  # time.monotonic() de la captura del último frame
+        self.last_frame = None             # CapturedFrame dueño del buffer de last_frame_bgr
+        self.frame_copy = None             # copia estable de un frame del anillo compartido (ver capture_to_base64)
+
+        # Hilo de captura dueño de la cámara (0 = webcam principal); avisa al GUI con una señal encolada
+        # (o, con CAPTURE_PROCESS, un proceso aparte que escribe en un anillo de memoria compartida)
+        if config.CAPTURE_PROCESS:
+            self.capture = ProcessCaptureWorker(
+                0,
+                slots=config.CAPTURE_RING_SLOTS,
+                max_width=config.CAPTURE_MAX_WIDTH,
+                max_height=config.CAPTURE_MAX_HEIGHT,
+                jpeg_quality=config.CAPTURE_PROCESS_JPEG_QUALITY,
+                buffer_size=config.CAPTURE_BUFFER_SIZE,
+            )
+        else:
+            self.capture = CaptureWorker(0, mjpeg=config.CAPTURE_MJPEG,
+                                         preview_reduction=config.CAPTURE_MJPEG_PREVIEW_REDUCTION,
+                                         buffer_size=config.CAPTURE_BUFFER_SIZE)
+        self.capture.frame_ready.connect(self.update_frame, Qt.QueuedConnection)
+        self.capture.start()
+
+        # Backend de predicción configurado (HTTP, local, ONNX en proceso o mock)
+        self.predictor = create_predictor(config.PREDICT_MODE)
+
+        # Pool de inferencia: post_request corre fuera del GUI y el resultado vuelve por señal
+        self.dispatcher = InferenceDispatcher(
+            self.post_request,
+            workers=config.INFERENCE_WORKERS,
+            max_in_flight=config.INFERENCE_MAX_IN_FLIGHT,
+            drop_policy=config.INFERENCE_DROP_POLICY,
+            batch_fn=self.post_batch if config.PREDICT_MODE == "http" and config.PREDICT_BATCH_SIZE > 1 else None,
+            batch_size=config.PREDICT_BATCH_SIZE,
+            batch_interval_ms=config.PREDICT_BATCH_INTERVAL_MS,
+        )
+        self.dispatcher.result_ready.connect(self.on_prediction, Qt.QueuedConnection)
+
+        # Frames que fallaron o no se llegaron a enviar: a disco, y se reenvían cuando el servidor vuelve
+        self.spool = None
+        if config.SPOOL_ENABLED:
+            self.spool = OfflineSpool(
+                self.base_dir / "captures" / SPOOL_DIR,
+                self.predictor.predict,
+                rate=config.SPOOL_REPLAY_RATE,
+                retry_min_s=config.SPOOL_RETRY_MIN_S,
+                retry_max_s=config.SPOOL_RETRY_MAX_S,
+                max_attempts=config.SPOOL_MAX_ATTEMPTS,
+                max_bytes=config.SPOOL_MAX_MB * 2**20,
+                index_path=(self.base_dir / "captures" / session_index.INDEX_DB
+                            if config.SESSION_INDEX_ENABLED else None),
+            )
+
+        # Filtro de frames casi iguales: se reutiliza la última predicción en vez de volver a enviar
+        self.gate = FrameGate(config.GATE_THRESHOLD, max_skip=config.GATE_MAX_SKIP) if config.GATE_ENABLED else None
+        self.last_prediction = None        # última predicción válida de la sesión
+
+        # Recorte a la región del alumno y resolución del modelo antes de codificar
+        self.preprocessor = FramePreprocessor(
+            config.PREPROCESS_ROI_MODE,
+            roi=parse_roi(config.PREPROCESS_ROI),
+            calibration_path=config.PREPROCESS_CALIBRATION_PATH,
+            model_size=parse_size(config.PREPROCESS_MODEL_SIZE),
+        )
+
+        # Calidad JPEG (y escala) ajustada según la latencia de predicción medida
+        self.quality = None
+        if config.QUALITY_ADAPTIVE:
+            self.quality = QualityController(
+                target_ms=config.QUALITY_TARGET_P95_MS,
+                q_min=config.QUALITY_MIN,
+                q_max=config.QUALITY_MAX,
+                q_initial=config.QUALITY_INITIAL,
+                step=config.QUALITY_STEP,
+                window=config.QUALITY_WINDOW,
+                adapt_scale=config.QUALITY_ADAPT_SCALE,
+            )
+
+        # Modo streaming: un WebSocket persistente reemplaza al pedido HTTP por frame
+        self.stream = None
+        self.stream_jobs = {}              # seq -> job de los frames enviados por el stream
+        if config.PREDICT_MODE == "stream":
+            from stream_client import StreamingPredictor
+            self.stream = StreamingPredictor(config.PREDICT_STREAM_URL, max_in_flight=config.INFERENCE_MAX_IN_FLIGHT)
+            self.stream.result_ready.connect(self.on_stream_result)
+            self.stream.open()
 
         # Timer de captura cada 3 segundos (no arrancar aquí; sólo durante la sesión)
         self.capture_timer = QTimer()
@@ -73,11 +173,49 @@ class CameraApp(QMainWindow):
         # cuando expire, primero detener capture_timer y luego finalizar la sesión (evita captura en t~fin)
         self.session_timer.timeout.connect(self.session_expired)
 
+        # Escritura de los frames de la sesión en segundo plano (cola acotada + política de fsync)
+        self.writer = SessionWriter(
+            max_queue=config.WRITER_MAX_QUEUE,
+            fsync_policy=config.WRITER_FSYNC,
+            backpressure_ms=config.WRITER_BACKPRESSURE_MS,
+        )
+
+        # Retención de captures/ (edad, espacio, sólo "correcta", archivado) en un proceso de prioridad baja
+        self.retention = None
+        if config.RETENTION_ENABLED:
+            self.retention = RetentionService(
+                self.base_dir / "captures",
+                max_age_days=config.RETENTION_MAX_AGE_DAYS,
+                max_bytes=int(config.RETENTION_MAX_GB * 2**30),
+                keep_only_correct=config.RETENTION_KEEP_ONLY_CORRECT,
+                compact_after_days=config.RETENTION_COMPACT_AFTER_DAYS,
+                archive_after_days=config.RETENTION_ARCHIVE_AFTER_DAYS,
+            )
+            self.retention_timer = QTimer()
+            self.retention_timer.timeout.connect(self.run_retention)
+            self.retention_timer.start(config.RETENTION_INTERVAL_MIN * 60 * 1000)
+            # primera pasada un rato después de abrir, para no competir con el arranque de la cámara
+            QTimer.singleShot(30000, self.run_retention)
+
         # Estado de sesión y almacenamiento
         self.session_active = False
+        self.session_id = 0                # identifica la sesión a la que pertenece cada pedido en vuelo
+        self.frame_seq = 0                 # número de secuencia de cada frame enviado a predecir
         self.session_dir = None
-        self.session_images = []           # lista de rutas de archivos guardados en la sesión
+        self.container = None              # SessionContainer de la sesión (modo "container")
+        self.manifest = None               # manifest.jsonl de la sesión, un registro por evento de frame
+        self.session_images = []           # rutas (o referencias al contenedor) de los frames guardados
         self.session_predictions = {}      # mapa ruta -> prediction
+        self.session_frames = []           # metadata por frame (calidad, escala, latencia, predicción)
+        # frames que el filtro no manda a predecir: crudos en RAM, se codifican sólo si hacen falta
+        self.store = self.new_frame_store()
+        # último frame "correcta" de la sesión: {"seq", "jpeg", "pixmap"} con el pixmap ya escalado al label
+        self.keeper = None
+        # decodificar el keeper agrupando resultados seguidos (como mucho una vez por intervalo)
+        self.keeper_timer = QTimer()
+        self.keeper_timer.setSingleShot(True)
+        self.keeper_timer.setInterval(250)
+        self.keeper_timer.timeout.connect(self.decode_keeper)
 
         # Conectar botón "Comenzar" que en la UI se llama btnComenzar
         try:
@@ -95,19 +233,29 @@ class CameraApp(QMainWindow):
 
         self.ui.show()
 
-    def log_session_error(self, message: str):
-        """Guardar mensajes de error en un archivo errors.log dentro de la sesión (no mostrar al usuario)."""
+    def log_session_error(self, message: str, seq: int = None, level: int = logging.ERROR):
+        """Registrar un error de la sesión en el log JSON (con sesión y frame; no se muestra al usuario).
+
+        Sólo encola: el archivo lo escribe el hilo del LogWriter.
+        """
+        log.log(level, message, extra={"seq": seq})
+
+    def save_session_metadata(self, proba=None):
+        """Guardar la metadata por frame (calidad JPEG, escala, latencia, predicción) y el puntaje en session.json."""
+        if self.session_dir is None:
+            return
+        data = {"session_id": self.session_id, "frames": self.session_frames, "proba": proba}
+        if self.quality:
+            data["quality_target_p95_ms"] = self.quality.target_ms
         try:
-            if self.session_dir is not None:
-                p = self.session_dir / "errors.log"
-                with open(p, "a", encoding="utf-8") as f:
-                    f.write(f"{int(time.time())}: {message}\n")
+            with open(self.session_dir / "session.json", "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=1)
         except Exception as e:
-            print(f"No se pudo escribir errors.log: {e}")
+            log.error(f"No se pudo escribir session.json: {e}")
 
     def session_expired(self):
         """Handler al expirar el timer de sesión: detener capture_timer para evitar captura en el borde, luego finalizar."""
-        print("Session timer expired: deteniendo capture_timer y finalizando sesión.")
+        log.info("Session timer expired: deteniendo capture_timer y finalizando sesión.")
         try:
             if self.capture_timer.isActive():
                 self.capture_timer.stop()
@@ -156,11 +304,14 @@ class CameraApp(QMainWindow):
                 btn_cerrar.clicked.connect(qdialog.accept)
             qdialog.exec()
         except Exception as e:
-            print(f"[POPUP] No se pudo abrir el popup: {e}")
+            log.error(f"[POPUP] No se pudo abrir el popup: {e}")
 
     def restart_camera(self):
         """Reinicia la cámara y limpia la vista final para poder intentar de nuevo."""
-        print("Reiniciando cámara y limpiando vista.")
+        log.info("Reiniciando cámara y limpiando vista.")
+        if self.session_active:
+            # la sesión cortada se guarda igual que una terminada (contenedor, session.json, historial)
+            self.finish_session()
         try:
 
             self.total = 0
@@ -173,13 +324,15 @@ class CameraApp(QMainWindow):
                 self.capture_timer.stop()
             self.session_active = False
 
-            if self.cap and self.cap.isOpened():
-                self.cap.release()
+            # detener el hilo de captura (libera la cámara)
+            self.capture.stop()
         except Exception:
             pass
 
         # Reabrir cámara
-        self.cap = cv2.VideoCapture(0)
+        self.release_last_frame()
+        self.capture.slot.reset_stats()
+        self.capture.start()
         # limpiar vistas
         try:
             self.label.clear()
@@ -187,47 +340,27 @@ class CameraApp(QMainWindow):
         except Exception:
             pass
 
-        # Asegurar que la vista previa vuelve a arrancar
-        if not self.timer.isActive():
-            self.timer.start(30)
-
-        print("Cámara reiniciada.")
+        log.info("Cámara reiniciada.")
 
-    def post_request(self, image: str):
-        """Envía la imagen al servidor y devuelve un dict consistente.
+    def post_request(self, image: bytes):
+        """Envía el JPEG al backend de predicción configurado y devuelve un dict consistente.
         En caso de éxito: {"prediction": <str>, "raw": <response-json>}.
         En caso de error: {"error": <mensaje>, ...}.
         """
-        payload = {"image": image}  # se pasa una imagen al request
-        print("Enviando request al servidor.")
-        try:
-            r = requests.post("http://127.0.0.1:8000/predictOne", json=payload, timeout=120)
-
-        except requests.RequestException as e:
-            # Error de red / timeout
-            print(f"[POST] Error de red: {e}")
-            return {"error": str(e)}
-
-        try:
-            data = r.json()
-
-        except ValueError:
-            # No era JSON
-            return {"error": "Respuesta no es JSON", "raw": r.text}
+        log.debug("Enviando request al servidor.")
+        result = self.predictor.predict(image)
+        if "prediction" in result:
+            log.debug(f"Resultado de prediccion: {result['prediction']}")
+        return result
 
-        if not r.ok:
-            # FastAPI suele usar {"detail": ...}
-            return {"error": "HTTP error", "status": r.status_code, "detail": data.get("detail", data)}
-
-        prediction = data.get("prediction")
-
-        if prediction is None:
-            # No vino 'prediction'; devuelve lo que vino para depurar
-            return {"error": "Campo 'prediction' ausente", "data": data}
-
-        print("Resultado de prediccion:", prediction)
-        return {"prediction": prediction, "raw": data}
 
+    def post_batch(self, items):
+        """Envía un lote de (job, jpeg) a /predictBatch y devuelve los resultados en el mismo orden.
+        Las predicciones se asocian a cada frame por su número de secuencia.
+        """
+        log.debug(f"Enviando lote de {len(items)} frames al servidor.")
+        results = self.predictor.predict_batch([(job["seq"], jpeg) for job, jpeg in items])
+        return [results[job["seq"]] for job, _ in items]
 
     def set_icon_result(self, result: str):
 
@@ -242,125 +375,352 @@ class CameraApp(QMainWindow):
     def start_session(self):
         """Iniciar una sesión de 11 segundos: guardar fotos cada 3s y evaluar."""
         if self.session_active:
-            print("Ya hay una sesión en curso.")
+            log.info("Ya hay una sesión en curso.")
             return
 
         timestamp = int(time.time())
         session_name = f"session_{timestamp}"
         self.session_dir = self.base_dir / "captures" / session_name
         self.session_dir.mkdir(parents=True, exist_ok=True)
+        app_log.set_session(session_name)
+        if self.spool:
+            self.spool.set_active(self.session_dir)
+        if config.SESSION_STORAGE == "container":
+            self.container = SessionContainer(self.session_dir)
+        self.manifest = SessionManifest(self.session_dir)
 
         self.session_active = True
+        self.session_id += 1
         self.session_images = []
         self.session_predictions = {}
+        self.session_frames = []
+        self.keeper = None
+        if self.store is not None:
+            self.store.clear()
+        self.dispatcher.reset_stats()
+        self.writer.reset_stats()
+        self.last_prediction = None
+        if self.gate:
+            self.gate.reset()
+        if self.stream:
+            self.stream.reset_stats()
+            self.stream_jobs = {}
 
         # Asegurar que la cámara y timers están corriendo
-        if not self.cap.isOpened():
-            self.cap = cv2.VideoCapture(0)
-        if not self.timer.isActive():
-            self.timer.start(30)
-        if not self.capture_timer.isActive():
+        if not self.capture.isRunning():
+            self.capture.start()
+        self.capture.slot.reset_stats()
+        # en modo streaming se envía cada frame que llega de la cámara (ver update_frame)
+        if self.stream is None and not self.capture_timer.isActive():
             self.capture_timer.start(30)
 
         # Hacer una captura inmediata al iniciar la sesión (t=0)
         try:
             self.capture_to_base64()
         except Exception as e:
-            print(f"Error al capturar inmediatamente: {e}")
+            log.error(f"Error al capturar inmediatamente: {e}")
 
         # Iniciar timer de 12 segundos
         self.session_timer.start(12000)
-        print(f"Sesión iniciada. Guardando en: {self.session_dir}")
+        log.info(f"Sesión iniciada. Guardando en: {self.session_dir}")
 
     def end_session(self):
         """Finalizar sesión: detener cámara, timers y mostrar la última foto correcta (si existe)."""
         if not self.session_active:
             return
 
-        self.session_active = False
-        self.session_timer.stop()
+        proba = self.finish_session()
 
-        # Detener captura y actualización de frames y liberar la cámara
-        if self.capture_timer.isActive():
-            self.capture_timer.stop()
-        if self.timer.isActive():
-            self.timer.stop()
-        if self.cap and self.cap.isOpened():
-            self.cap.release()
-
-        # Buscar la última imagen marcada como 'correcta'
-        last_correct = None
-        for path in reversed(self.session_images):
-            pred = self.session_predictions.get(str(path))
-            if pred == "correcta":
-                last_correct = path
-                break
-
-        if last_correct:
-            pix = QPixmap(str(last_correct))
-            pix = pix.scaled(self.label.size(), Qt.KeepAspectRatio, Qt.SmoothTransformation)
+        # Mostrar la última foto 'correcta', ya decodificada y escalada durante la sesión
+        if self.keeper is not None:
+            pix = self.keeper["pixmap"]
+            if pix.width() > self.label.width() or pix.height() > self.label.height():
+                pix = pix.scaled(self.label.size(), Qt.KeepAspectRatio, Qt.SmoothTransformation)
             self.label.setPixmap(pix)
-            print(f"Mostrando última foto correcta: {last_correct}")
+            log.info(f"Mostrando última foto correcta: frame {self.keeper['seq']}")
         else:
             # No mostrar foto final si no hay correcta (limpiar o dejar como estaba)
             self.label.clear()
-            print("No se encontró ninguna foto correcta en la sesión.")
+            log.info("No se encontró ninguna foto correcta en la sesión.")
 
-        print("Sesión finalizada.")
+        self.show_session_popup(proba)
 
+    def finish_session(self) -> float:
+        """Cierre común de end_session y restart_camera: detener la captura, guardar lo pendiente,
+        cerrar contenedor y manifiesto, registrar la sesión (session.json e historial) y liberarla
+        en el spool y en el log. Devuelve el puntaje."""
+        self.session_active = False
+        self.session_timer.stop()
+
+        # Detener captura y actualización de frames y liberar la cámara
+        if self.capture_timer.isActive():
+            self.capture_timer.stop()
+        self.capture.stop()
+        # los pedidos que no empezaron ya no cuentan para esta sesión (quedan en el spool, si está)
+        unsent = self.dispatcher.clear_pending()
+        if self.stream:
+            unsent += [(job, job["jpeg"]) for job in self.stream_jobs.values()]
+        for job, jpeg in unsent:
+            self.spool_frame(job, jpeg)
+
+        stats = self.capture.slot.stats()
+        log.info(f"[CAPTURA] frames={stats['captured']} descartados={stats['dropped']} tardíos={stats['late']} "
+                 f"drenados del buffer={self.capture.drained}")
+        stats = self.dispatcher.stats()
+        log.info(f"[PREDICT] enviados={stats['submitted']} descartados={stats['dropped']} en vuelo={stats['in_flight']}")
+        if self.spool:
+            stats = self.spool.stats()
+            log.info(f"[SPOOL] pendientes={stats['pending']} reenviados={stats['replayed']} "
+                     f"abandonados={stats['abandoned']}")
+        if self.stream:
+            self.stream_jobs = {}
+            stats = self.stream.stats()
+            log.info(f"[STREAM] enviados={stats['sent']} recibidos={stats['received']} "
+                     f"descartados={stats['dropped']} en vuelo={stats['in_flight']}")
+        latencies = [m["capture_to_result_ms"] for m in self.session_frames if "capture_to_result_ms" in m]
+        if latencies:
+            log.info(f"[LATENCIA] captura->resultado p50={percentile(latencies, 50):.0f} ms "
+                     f"p95={percentile(latencies, 95):.0f} ms")
+        if self.gate:
+            log.info(f"[GATE] enviados={self.gate.sent} reutilizados={self.gate.skipped}")
+        stats = self.predictor.stats()
+        log.info("[CLIENTE] " + " ".join(f"{k}={v}" for k, v in stats.items()))
+
+        # la foto final se decodifica antes de que el FrameStore pase al escritor
+        self.keeper_timer.stop()
+        if self.keeper is not None and self.keeper["pixmap"] is None:
+            # llegó justo antes del cierre y todavía no se había decodificado
+            self.decode_keeper()
+        if self.store is not None:
+            log.info(f"[RAM] frames sin codificar={len(self.store.seqs())} pisados={self.store.evicted} "
+                     f"slots={self.store.slots}")
+        self.persist_deferred()
+
+        # Cerrar contenedor y manifiesto después de lo ya encolado; el escritor termina solo
+        self.writer.sync()
+        for target in (self.container, self.manifest):
+            if target is not None:
+                self.writer.close_container(target)
+        self.container = self.manifest = None
+        stats = self.writer.stats()
+        log.info(f"[DISCO] escritos={stats['written']} descartados={stats['dropped']} "
+                 f"fallidos={stats['failed']} bytes={stats['bytes']} en cola={stats['queued']}")
+
+        proba = 0.0
         try:
             proba = 10 * self.cant_ok / self.total
 
             self.total = 0
             self.cant_ok = 0
 
-            print("proba ",proba)
+            log.info(f"proba {proba}")
         except Exception as e:
-            print(f"Error al calcular el puntaje: {e}")
-
-        self.show_session_popup(proba)
+            log.error(f"Error al calcular el puntaje: {e}")
+
+        self.save_session_metadata(proba)
+        if config.SESSION_INDEX_ENABLED:
+            # el historial de sesiones se consulta en captures/index.db (ver tools/session_history.py)
+            session_index.record_in_background(self.base_dir / "captures" / session_index.INDEX_DB,
+                                               self.session_dir.name, self.session_frames, proba)
+        self.run_retention()
+        if self.spool:
+            # el spool reabre la sesión recién cuando el escritor cerró contenedor y manifiesto
+            session_dir = self.session_dir
+            self.writer.call_after(lambda: self.spool.release(session_dir))
+
+        log.info("Sesión finalizada.")
+        app_log.set_session(None)
+        return proba
 
     def capture_to_base64(self):
-        """Toma el último frame, lo guarda en disco si hay sesión activa, lo envía y guarda la predicción."""
+        """Toma el último frame, lo guarda en disco si hay sesión activa y lo encola para predecir."""
         if self.last_frame_bgr is None:
             return
+        # con captura en proceso aparte el frame es una vista del anillo: copiarlo y verificar
+        # que no se haya pisado antes de filtrarlo, codificarlo o guardarlo
+        frame_bgr = self.last_frame.stable(self.frame_copy)
+        if frame_bgr is None:
+            log.debug("[CAPTURA] Frame pisado en el anillo antes de usarlo; se saltea")
+            return
+        if frame_bgr is not self.last_frame_bgr:
+            self.frame_copy = frame_bgr
 
-        # Codificar a JPEG en memoria (calidad 90)
-        ok, buf = cv2.imencode(".jpg", self.last_frame_bgr, [int(cv2.IMWRITE_JPEG_QUALITY), 90])
-        if not ok:
-            print("No se pudo codificar el frame.")
+        # ¿Cambió lo suficiente desde el último frame enviado? Sin predicción previa, enviar siempre
+        send = self.gate is None or self.gate.should_send(frame_bgr, force=self.last_prediction is None)
+
+        if not send and self.store is not None and self.session_active:
+            self.defer_frame(frame_bgr)
             return
 
+        quality, scale = (self.quality.quality, self.quality.scale) if self.quality else (90, 1.0)
+        # JPEG de la cámara tal cual, salvo que haya que recortar o el controlador haya bajado la calidad
+        passthrough = (self.last_frame_jpeg is not None and not self.preprocessor.enabled
+                       and (self.quality is None or (quality >= self.quality.q_initial and scale == 1.0)))
+        if passthrough:
+            jpeg = self.last_frame_jpeg
+            quality = "camera"
+        else:
+            # Recortar/redimensionar y codificar a JPEG en memoria (calidad fija 90 o la del controlador)
+            encode_src = self.full_resolution(frame_bgr)
+            if self.preprocessor.enabled:
+                encode_src = self.preprocessor.process(encode_src)
+            if scale < 1.0:
+                encode_src = cv2.resize(encode_src, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+            ok, buf = cv2.imencode(".jpg", encode_src, [int(cv2.IMWRITE_JPEG_QUALITY), quality])
+            if not ok:
+                log.warning("No se pudo codificar el frame.")
+                return
+            jpeg = buf.tobytes()
+
         # Si hay una sesión activa, guardar la imagen en disco
         saved_path = None
-        if self.session_active and self.session_dir is not None:
-            idx = len(self.session_images) + 1
-            filename = self.session_dir / f"frame_{idx:03d}_{time.strftime('%Y%m%d-%H%M%S')}.jpg"
-            try:
-                with open(filename, "wb") as f:
-                    f.write(buf.tobytes())
+        if self.session_active and self.container is not None:
+            # se agrega al contenedor en segundo plano; si la cola está llena el frame no se guarda
+            if self.writer.append(self.container, self.frame_seq + 1, jpeg, time.time()):
+                saved_path = frame_ref(self.session_dir, self.frame_seq + 1)
+                self.session_images.append(saved_path)
+        elif self.session_active and self.session_dir is not None:
+            filename = self.frame_filename()
+            # se escribe en segundo plano; si la cola está llena el frame no se guarda
+            if self.writer.write(filename, jpeg):
                 saved_path = filename
                 self.session_images.append(filename)
-            except Exception as e:
-                print(f"No se pudo guardar la imagen en disco: {e}")
 
-        b64_str = base64.b64encode(buf.tobytes()).decode("utf-8")
+        self.frame_seq += 1
+        meta = {"seq": self.frame_seq, "path": str(saved_path) if saved_path else None,
+                "quality": quality, "scale": scale, "bytes": len(jpeg), "size": jpeg_size(jpeg)}
+        self.session_frames.append(meta)
+        job = {"session": self.session_id, "seq": self.frame_seq, "path": saved_path, "jpeg": jpeg,
+               "meta": meta, "sent_at": time.monotonic(), "captured_at": self.last_frame_captured_at,
+               "session_dir": self.session_dir if self.session_active else None}
+        self.log_frame(job, gated=not send)
+        if not send:
+            # frame casi igual al último enviado: puntuar con la predicción anterior
+            self.on_prediction(job, {"prediction": self.last_prediction, "reused": True})
+            return
+        if self.stream:
+            self.stream_jobs[self.frame_seq] = job
+            if not self.stream.send(self.frame_seq, jpeg):
+                del self.stream_jobs[self.frame_seq]
+                self.spool_frame(job, jpeg)
+            return
+        # el cliente decide en su hilo si lo manda crudo o en base64 según el transporte
+        dropped = self.dispatcher.submit(job, jpeg)
+        if dropped is not None:
+            # sin lugar en vuelo (servidor lento o caído): el frame descartado queda en el spool
+            self.spool_frame(*dropped)
+
+    def full_resolution(self, frame_bgr):
+        """Frame a resolución de cámara para codificar. En MJPEG last_frame_bgr es la vista previa
+        reducida (CAPTURE_MJPEG_PREVIEW_REDUCTION): se decodifica el JPEG de la cámara completo."""
+        size = jpeg_size(self.last_frame_jpeg) if self.last_frame_jpeg is not None else None
+        if size is None or size == (frame_bgr.shape[1], frame_bgr.shape[0]):
+            return frame_bgr
+        full = cv2.imdecode(np.frombuffer(self.last_frame_jpeg, np.uint8), cv2.IMREAD_COLOR)
+        return frame_bgr if full is None else full
+
+    def defer_frame(self, frame_bgr):
+        """Frame casi igual al último enviado: guardarlo crudo en el FrameStore (sin codificar ni
+        escribir) y puntuarlo con la predicción anterior. Se codifica sólo si termina siendo la
+        foto final o si se exporta la sesión (SESSION_STORE_EXPORT)."""
+        self.frame_seq += 1
+        self.store.put(self.frame_seq, frame_bgr)
+        meta = {"seq": self.frame_seq, "path": None, "quality": None, "scale": self.store.scale,
+                "bytes": 0, "deferred": True, "captured_at": round(wall_time(self.last_frame_captured_at), 3)}
+        self.session_frames.append(meta)
+        job = {"session": self.session_id, "seq": self.frame_seq, "path": None, "jpeg": None, "deferred": True,
+               "meta": meta, "sent_at": time.monotonic(), "captured_at": self.last_frame_captured_at}
+        self.log_frame(job, gated=True)
+        self.on_prediction(job, {"prediction": self.last_prediction, "reused": True})
+
+    def persist_deferred(self):
+        """Al terminar la sesión: codificar y guardar (en el hilo escritor) los frames crudos que
+        hay que conservar: la foto final y, con SESSION_STORE_EXPORT, todos los que siguen en RAM."""
+        if self.store is None or self.session_dir is None:
+            return
+        keep = set(self.store.seqs()) if config.SESSION_STORE_EXPORT else set()
+        if self.keeper is not None and self.keeper.get("deferred"):
+            keep.add(self.keeper["seq"])
+        frames = []
+        for meta in self.session_frames:
+            if meta["seq"] not in keep or self.store.get(meta["seq"]) is None:
+                continue
+            if self.container is not None:
+                target = self.container
+                ref = frame_ref(self.session_dir, meta["seq"])
+            else:
+                target = ref = self.frame_filename()
+            frames.append((target, meta["seq"], meta.get("prediction"), meta["captured_at"]))
+            meta["path"] = str(ref)
+            self.session_images.append(ref)
+            self.session_predictions[str(ref)] = meta.get("prediction")
+        if frames:
+            # el store pasa al escritor; la próxima sesión usa uno nuevo
+            self.writer.export(self.store, frames, config.SESSION_STORE_JPEG_QUALITY)
+            self.store = self.new_frame_store()
+
+    def new_frame_store(self):
+        if not config.SESSION_STORE_ENABLED:
+            return None
+        return FrameStore(config.SESSION_STORE_MB * 2**20, config.SESSION_STORE_SCALE)
+
+    def frame_filename(self) -> Path:
+        idx = len(self.session_images) + 1
+        return self.session_dir / f"frame_{idx:03d}_{time.strftime('%Y%m%d-%H%M%S')}.jpg"
+
+    def log_frame(self, job: dict, gated: bool):
+        """Agregar al manifiesto de la sesión el registro de captura de un frame."""
+        if self.manifest is None:
+            return
+        meta = job["meta"]
+        self.writer.log(self.manifest, {
+            "event": EVENT_FRAME, "seq": job["seq"], "ref": meta["path"],
+            "captured_at": round(wall_time(job["captured_at"]), 3),
+            "sent_at": round(wall_time(job["sent_at"]), 3),
+            "bytes": meta["bytes"], "quality": meta["quality"], "scale": meta["scale"], "gated": gated,
+            "deferred": job.get("deferred", False),
+        })
+
+    def on_stream_result(self, seq: int, result):
+        """Slot del GUI: predicción que llega por el WebSocket, asociada al frame por su secuencia."""
+        job = self.stream_jobs.pop(seq, None)
+        if job is not None:
+            self.on_prediction(job, result)
+
+    def on_prediction(self, job: dict, result):
+        """Slot del GUI: recibe el resultado de post_request de un frame enviado por capture_to_base64."""
+        # resultados de una sesión que ya terminó: los errores van al spool para corregirla después
+        if job["session"] != self.session_id or not self.session_active:
+            if isinstance(result, dict) and "error" in result:
+                self.spool_frame(job, job["jpeg"])
+            return
+        saved_path = job["path"]
+        meta = job["meta"]
 
-        result = self.post_request(b64_str)
+        # latencia de ida y vuelta (no aplica a predicciones reutilizadas por el filtro)
+        if isinstance(result, dict) and result.get("reused"):
+            meta["reused"] = True
+        else:
+            now = time.monotonic()
+            meta["latency_ms"] = round((now - job["sent_at"]) * 1000, 1)
+            # lo que importa para la devolución en vivo: desde que la cámara tomó el frame
+            meta["capture_to_result_ms"] = round((now - job["captured_at"]) * 1000, 1)
+            if self.quality:
+                self.quality.record(meta["latency_ms"])
 
         # Manejar errores del post_request
         if isinstance(result, dict) and "error" in result:
             # Registrar error para revisar luego (no mostrar al usuario)
             err_msg = result.get("error")
-            print(f"[PREDICT] Error: {err_msg}")
-            # registrar en archivo de la sesión
-            try:
-                self.log_session_error(str(err_msg))
-            except Exception:
-                pass
+            # registrar en el log de la sesión (con el frame); WARNING para poder silenciarlo con el servidor caído
+            self.log_session_error(f"[PREDICT] Error: {err_msg}", job["seq"], logging.WARNING)
+            self.spool_frame(job, job["jpeg"])
             # marcar la predicción como error si se guardó la imagen
             if saved_path is not None:
                 self.session_predictions[str(saved_path)] = f"ERROR: {err_msg}"
+                self.store_prediction(job["seq"], f"ERROR: {err_msg}")
+            meta["error"] = str(err_msg)
+            self.log_result(job, error=str(err_msg))
             return
 
         # extraer prediction en los distintos formatos posibles
@@ -370,52 +730,175 @@ class CameraApp(QMainWindow):
         elif isinstance(result, str):
             prediction = result
         else:
-            print(f"[PREDICT] formato inesperado: {result}")
+            log.warning(f"[PREDICT] formato inesperado: {result}")
+            self.log_result(job, error="formato inesperado")
             return
 
-        print(f"[PREDICT] prediction={prediction}")
+        log.debug(f"[PREDICT] prediction={prediction} captura->resultado={meta.get('capture_to_result_ms', '-')} ms")
 
         # guardar la predicción asociada al archivo si fue guardado
         if saved_path is not None:
             self.session_predictions[str(saved_path)] = prediction
+            self.store_prediction(job["seq"], prediction)
+        meta["prediction"] = prediction
+        self.last_prediction = prediction
+        self.log_result(job, prediction=prediction)
+        if prediction == "correcta":
+            self.keep_frame(job)
 
         # Actualizar el ícono de resultado
         self.set_icon_result(prediction)
 
 
+    def log_result(self, job: dict, prediction=None, error=None):
+        """Agregar al manifiesto de la sesión el resultado de un frame (predicción o error)."""
+        if self.manifest is None:
+            return
+        meta = job["meta"]
+        self.writer.log(self.manifest, {
+            "event": EVENT_RESULT, "seq": job["seq"], "received_at": round(time.time(), 3),
+            "latency_ms": meta.get("latency_ms"), "capture_to_result_ms": meta.get("capture_to_result_ms"),
+            "reused": meta.get("reused", False), "prediction": prediction, "error": error,
+        })
+
+    def run_retention(self):
+        """Lanzar una pasada de mantenimiento de captures/ (no durante una sesión; no bloquea)."""
+        if self.retention is not None and not self.session_active:
+            self.retention.trigger()
+
+    def store_prediction(self, seq: int, prediction):
+        """Anotar la predicción en el índice del contenedor de la sesión (modo "container")."""
+        if self.container is not None and prediction is not None:
+            self.writer.set_prediction(self.container, seq, str(prediction))
+
+    def spool_frame(self, job: dict, jpeg):
+        """Guardar en el spool un frame sin predicción para reenviarlo cuando el servidor responda."""
+        session_dir = job.get("session_dir")
+        if self.spool is None or jpeg is None or session_dir is None:
+            return
+        self.spool.add(session_dir, job["seq"], jpeg, ref=job["path"],
+                       captured_at=round(wall_time(job["captured_at"]), 3))
+        job["meta"]["spooled"] = True
+
+    def keep_frame(self, job: dict):
+        """Recordar el frame como última foto 'correcta' (se decodifica y escala fuera del resultado)."""
+        if self.keeper is not None and self.keeper["seq"] > job["seq"]:
+            return
+        self.keeper = {"seq": job["seq"], "jpeg": job["jpeg"], "pixmap": None, "deferred": job.get("deferred", False)}
+        if self.keeper["deferred"]:
+            # que el anillo no lo pise antes de mostrarlo/guardarlo
+            self.store.pin(job["seq"])
+        if not self.keeper_timer.isActive():
+            self.keeper_timer.start()
+
+    def decode_keeper(self):
+        """Decodificar y reducir al tamaño del label el JPEG del keeper (una vez por keeper)."""
+        keeper = self.keeper
+        if keeper is None or keeper["pixmap"] is not None:
+            return
+        size = self.label.size()
+        if keeper["deferred"]:
+            frame = self.store.get(keeper["seq"])
+            keeper["pixmap"] = fit_pixmap(frame, size.width(), size.height()) if frame is not None else QPixmap()
+        else:
+            keeper["pixmap"] = decode_scaled(keeper["jpeg"], size.width(), size.height())
+        keeper["jpeg"] = None
+
+    def release_last_frame(self):
+        """Devolver al pool de captura el buffer del último frame y olvidar sus datos."""
+        if self.last_frame is not None:
+            self.last_frame.release()
+        self.last_frame = None
+        self.last_frame_bgr = None
+        self.last_frame_jpeg = None
+
     def update_frame(self):
-        ok, frame_bgr = self.cap.read()
-        if not ok:
+        """Slot del GUI: toma el frame más reciente publicado por el hilo de captura y lo muestra."""
+        # ignorar notificaciones encoladas que llegan después de detener la captura
+        if not self.capture.isRunning():
+            return
+        frame = self.capture.slot.take()
+        if frame is None:
             return
+        frame_bgr = frame.image
 
+        # el GUI es dueño de un solo frame a la vez: el anterior vuelve al pool
+        if self.last_frame is not None:
+            self.last_frame.release()
+        self.last_frame = frame
         self.last_frame_bgr = frame_bgr  # ¡guardar último frame!
+        self.last_frame_jpeg = frame.jpeg
+        self.last_frame_captured_at = frame.captured_at
 
-        frame_rgb = cv2.cvtColor(frame_bgr, cv2.COLOR_BGR2RGB)
-        h, w, ch = frame_rgb.shape
-        qimg = QImage(frame_rgb.data, w, h, ch*w, QImage.Format_RGB888)
-        self.label.setPixmap(QPixmap.fromImage(qimg))
+        self.preview.render(frame_bgr)
 
-    def closeEvent(self, event):
-        """Cerrar cámara al cerrar la app"""
+        # en modo streaming la sesión corre a la velocidad nativa de la cámara
+        if self.stream and self.session_active:
+            self.capture_to_base64()
+
+    def shutdown(self):
+        """Detener timers, hilo de captura y pool de inferencia."""
         try:
             if self.capture_timer.isActive():
                 self.capture_timer.stop()
         except Exception:
             pass
         try:
-            if self.timer.isActive():
-                self.timer.stop()
+            self.capture.stop()
+            self.release_last_frame()
+            if isinstance(self.capture, ProcessCaptureWorker):
+                self.capture.close()
         except Exception:
             pass
         try:
-            if self.cap and self.cap.isOpened():
-                self.cap.release()
+            if self.spool is not None:
+                self.spool.close()
         except Exception:
             pass
+        try:
+            if self.retention is not None:
+                self.retention_timer.stop()
+                self.retention.stop()
+        except Exception:
+            pass
+        try:
+            self.dispatcher.shutdown()
+        except Exception:
+            pass
+        try:
+            self.predictor.close()
+        except Exception:
+            pass
+        try:
+            for target in (self.container, self.manifest):
+                if target is not None:
+                    self.writer.close_container(target)
+            self.container = self.manifest = None
+            self.writer.close()
+        except Exception:
+            pass
+        try:
+            if self.stream:
+                self.stream.close()
+        except Exception:
+            pass
+
+    def closeEvent(self, event):
+        """Cerrar cámara al cerrar la app"""
+        self.shutdown()
         event.accept()
 
 
 if __name__ == "__main__":
+    # log en consola + captures/logs/heimlich.jsonl, escrito en lote desde un hilo aparte
+    log_writer = app_log.setup_logging(
+        Path(__file__).resolve().parents[1] / "captures" / "logs",
+        level=config.LOG_LEVEL, file_level=config.LOG_FILE_LEVEL,
+        max_bytes=config.LOG_MAX_BYTES, backups=config.LOG_BACKUPS, batch_size=config.LOG_BATCH_SIZE,
+    )
     app = QApplication(sys.argv)
     window = CameraApp()
+    # la ventana visible es self.ui, así que closeEvent de CameraApp no siempre se dispara
+    app.aboutToQuit.connect(window.shutdown)
+    app.aboutToQuit.connect(log_writer.close)
     sys.exit(app.exec())
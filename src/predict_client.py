@@ -0,0 +1,253 @@
+# src/predict_client.py
+import base64
+import logging
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util import parse_url
+
+from predictors import Predictor
+
+log = logging.getLogger(__name__)
+
+# Errores HTTP que se consideran transitorios y se reintentan
+RETRY_STATUS = (502, 503, 504)
+# Respuestas que indican que el servidor no entiende el cuerpo binario
+UNSUPPORTED_STATUS = (400, 415, 422)
+
+TRANSPORT_JSON = "json"            # {"image": <base64>} (formato original)
+TRANSPORT_OCTET = "octet"          # JPEG crudo como application/octet-stream
+TRANSPORT_MULTIPART = "multipart"  # JPEG como archivo en multipart/form-data
+TRANSPORTS = (TRANSPORT_JSON, TRANSPORT_OCTET, TRANSPORT_MULTIPART)
+
+
+def build_request_kwargs(transport: str, jpeg: bytes) -> dict:
+    """Arma los argumentos de requests.post para enviar un JPEG con el transporte indicado."""
+    if transport == TRANSPORT_OCTET:
+        return {"data": jpeg, "headers": {"Content-Type": "application/octet-stream"}}
+    if transport == TRANSPORT_MULTIPART:
+        return {"files": {"image": ("frame.jpg", jpeg, "image/jpeg")}}
+    return {"json": {"image": base64.b64encode(jpeg).decode("utf-8")}}
+
+
+def build_batch_kwargs(transport: str, items) -> dict:
+    """Arma un pedido para /predictBatch con una lista de (seq, jpeg).
+
+    En JSON: {"images": [{"id": seq, "image": <base64>}, ...]}. En los transportes
+    binarios se usa multipart con un archivo "images" por frame llamado "<seq>.jpg".
+    """
+    if transport == TRANSPORT_JSON:
+        images = [{"id": seq, "image": base64.b64encode(jpeg).decode("utf-8")} for seq, jpeg in items]
+        return {"json": {"images": images}}
+    return {"files": [("images", (f"{seq}.jpg", jpeg, "image/jpeg")) for seq, jpeg in items]}
+
+
+class PredictClient(Predictor):
+    """Cliente HTTP de larga vida para /predictOne (y /predictBatch si se configura).
+
+    Mantiene un pool de conexiones keep-alive (requests.Session + HTTPAdapter), aplica un
+    deadline total por pedido y reintenta errores transitorios con backoff exponencial
+    con jitter. Es seguro usarlo desde varios hilos del pool de inferencia.
+
+    Con un transporte binario ("octet" o "multipart") el primer pedido negocia: si el
+    servidor lo rechaza (400/415/422) el cliente vuelve al JSON con base64 y lo recuerda.
+    """
+
+    def __init__(self, url: str, pool_size: int = 4, connect_timeout: float = 3.0,
+                 read_timeout: float = 10.0, deadline: float = 10.0, retries: int = 2,
+                 backoff_base: float = 0.1, backoff_max: float = 1.0,
+                 transport: str = TRANSPORT_JSON, batch_url: str = None):
+        if transport not in TRANSPORTS:
+            raise ValueError(f"Transporte desconocido: {transport}")
+        self.url = url
+        self.batch_url = batch_url
+        self.transport = transport
+        # por endpoint: sin entrada = sin negociar; True/False = el servidor acepta (o no) el binario
+        self._binary_ok = {}
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.deadline = deadline
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self.session = requests.Session()
+        # un pool por host: el de /predict y, si está en otro host, el del lote
+        self.adapter = HTTPAdapter(pool_connections=2, pool_maxsize=max(1, pool_size), max_retries=0)
+        self.session.mount("http://", self.adapter)
+        self.session.mount("https://", self.adapter)
+
+        self._lock = threading.Lock()
+        self.requests_sent = 0
+        self.retried = 0
+
+    def _backoff(self, attempt: int, remaining: float) -> float:
+        """Espera con 'full jitter': uniforme entre 0 y base*2^intento (acotado)."""
+        cap = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        return min(random.uniform(0, cap), max(0.0, remaining))
+
+    def post(self, url: str = None, **kwargs) -> requests.Response:
+        """POST al endpoint con deadline total y reintentos. Lanza requests.RequestException si se agota."""
+        start = time.monotonic()
+        attempt = 0
+        while True:
+            remaining = self.deadline - (time.monotonic() - start)
+            if remaining <= 0:
+                raise requests.Timeout(f"Deadline de {self.deadline}s agotado")
+            timeout = (min(self.connect_timeout, remaining), min(self.read_timeout, remaining))
+            with self._lock:
+                self.requests_sent += 1
+            try:
+                r = self.session.post(url or self.url, timeout=timeout, **kwargs)
+                if r.status_code not in RETRY_STATUS or attempt >= self.retries:
+                    return r
+                reason = f"HTTP {r.status_code}"
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt >= self.retries:
+                    raise
+                reason = str(e)
+
+            remaining = self.deadline - (time.monotonic() - start)
+            wait = self._backoff(attempt, remaining)
+            log.warning(f"[POST] Error transitorio ({reason}); reintento {attempt + 1} en {wait:.2f}s")
+            with self._lock:
+                self.retried += 1
+            time.sleep(wait)
+            attempt += 1
+
+    def active_transport(self, url: str = None) -> str:
+        """Transporte que se usa ahora para el endpoint (después de la negociación)."""
+        if self._binary_ok.get(url or self.url) is False:
+            return TRANSPORT_JSON
+        return self.transport
+
+    def _send(self, url: str, build, payload) -> requests.Response:
+        """Envía con el transporte activo y, si hace falta, negocia el fallback a JSON."""
+        transport = self.active_transport(url)
+        r = self.post(url, **build(transport, payload))
+        if transport != TRANSPORT_JSON and url not in self._binary_ok:
+            if r.status_code in UNSUPPORTED_STATUS:
+                log.warning(f"[POST] {url} no acepta '{transport}' (HTTP {r.status_code}); se usa JSON")
+                self._binary_ok[url] = False
+                return self.post(url, **build(TRANSPORT_JSON, payload))
+            if r.ok:
+                self._binary_ok[url] = True
+        return r
+
+    @staticmethod
+    def _parse(r: requests.Response):
+        """Devuelve (data, None) con el JSON de una respuesta exitosa o (None, dict de error)."""
+        try:
+            data = r.json()
+        except ValueError:
+            # No era JSON
+            return None, {"error": "Respuesta no es JSON", "status": r.status_code, "raw": r.text}
+
+        if not r.ok:
+            # FastAPI suele usar {"detail": ...}
+            detail = data.get("detail", data) if isinstance(data, dict) else data
+            return None, {"error": "HTTP error", "status": r.status_code, "detail": detail}
+        return data, None
+
+    def predict(self, jpeg: bytes) -> dict:
+        """Envía el JPEG al servidor y devuelve un dict consistente.
+        En caso de éxito: {"prediction": <str>, "raw": <response-json>}.
+        En caso de error: {"error": <mensaje>, ...}.
+        """
+        try:
+            r = self._send(self.url, build_request_kwargs, jpeg)
+        except requests.RequestException as e:
+            # Error de red / timeout (WARNING como todo error por frame: LOG_LEVEL=ERROR los silencia)
+            log.warning(f"[POST] Error de red: {e}")
+            return {"error": str(e)}
+
+        data, error = self._parse(r)
+        if error is not None:
+            return error
+
+        prediction = data.get("prediction")
+        if prediction is None:
+            # No vino 'prediction'; devuelve lo que vino para depurar
+            return {"error": "Campo 'prediction' ausente", "data": data}
+
+        return {"prediction": prediction, "raw": data}
+
+    def predict_batch(self, items) -> dict:
+        """Envía una lista de (seq, jpeg) a /predictBatch y devuelve {seq: resultado}.
+
+        Cada resultado tiene la misma forma que el de predict(). La respuesta esperada es
+        {"predictions": [{"id": seq, "prediction": ...}, ...]}; si los elementos no traen
+        "id" se asocian por posición.
+        """
+        if not self.batch_url:
+            raise RuntimeError("No hay batch_url configurada")
+        seqs = [seq for seq, _ in items]
+        try:
+            r = self._send(self.batch_url, build_batch_kwargs, items)
+        except requests.RequestException as e:
+            log.warning(f"[POST] Error de red (lote): {e}")
+            return {seq: {"error": str(e)} for seq in seqs}
+
+        data, error = self._parse(r)
+        if error is None and not isinstance(data.get("predictions") if isinstance(data, dict) else None, list):
+            error = {"error": "Campo 'predictions' ausente", "data": data}
+        if error is not None:
+            return {seq: error for seq in seqs}
+
+        # el id puede volver como texto (p. ej. tomado del nombre de archivo del multipart)
+        by_id = {str(seq): seq for seq in seqs}
+        results = {}
+        for pos, item in enumerate(data["predictions"]):
+            positional = seqs[pos] if pos < len(seqs) else None
+            if isinstance(item, dict):
+                seq = by_id.get(str(item["id"])) if "id" in item else positional
+                prediction = item.get("prediction")
+            else:
+                seq = positional
+                prediction = item
+            if seq is None:
+                continue
+            if prediction is None:
+                results[seq] = {"error": "Campo 'prediction' ausente", "data": item}
+            else:
+                results[seq] = {"prediction": prediction, "raw": item}
+        for seq in seqs:
+            results.setdefault(seq, {"error": "Frame sin predicción en la respuesta del lote"})
+        return results
+
+    def _pool_counts(self, url: str):
+        """(abiertas, reutilizadas) del pool que requests usa para `url`, sin crear uno nuevo.
+
+        Se busca entre los pools existentes por esquema/host/puerto: connection_from_url()
+        armaría otra clave (sin los atributos TLS del adapter) y, con pool_connections chico,
+        desalojaría el pool en uso.
+        """
+        target = parse_url(url)
+        scheme = (target.scheme or "http").lower()
+        host = (target.host or "").lower()
+        port = target.port or {"http": 80, "https": 443}.get(scheme)
+        pools = self.adapter.poolmanager.pools
+        for key in pools.keys():
+            if (key.key_scheme, key.key_host, key.key_port) == (scheme, host, port):
+                pool = pools.get(key)
+                if pool is not None:
+                    return pool.num_connections, max(0, pool.num_requests - pool.num_connections)
+        return 0, 0
+
+    def stats(self) -> dict:
+        """Métricas de reutilización de conexiones del pool."""
+        with self._lock:
+            sent, retried = self.requests_sent, self.retried
+        opened, reused = self._pool_counts(self.url)
+        stats = {"transport": self.active_transport(), "requests": sent, "retried": retried,
+                 "connections_opened": opened, "connections_reused": reused}
+        if self.batch_url:
+            opened, reused = self._pool_counts(self.batch_url)
+            stats.update(batch_connections_opened=opened, batch_connections_reused=reused)
+        return stats
+
+    def close(self):
+        self.session.close()
@@ -0,0 +1,152 @@
+# src/predictors.py
+import itertools
+import threading
+import time
+
+import config
+
+LABEL_OK = "correcta"
+
+
+class Predictor:
+    """Interfaz común de los backends de predicción.
+
+    predict() recibe el JPEG de un frame y devuelve {"prediction": <str>, ...} o
+    {"error": <mensaje>, ...}. Se llama desde los hilos del pool de inferencia, así que
+    las implementaciones tienen que ser seguras entre hilos.
+    """
+
+    def predict(self, jpeg: bytes) -> dict:
+        raise NotImplementedError
+
+    def stats(self) -> dict:
+        return {}
+
+    def close(self):
+        pass
+
+
+class MockPredictor(Predictor):
+    """Backend falso para probar la app sin servidor: devuelve siempre la misma predicción
+    (o alterna entre varias) con una demora opcional."""
+
+    def __init__(self, predictions=(LABEL_OK,), delay_ms: int = 0):
+        self.delay = delay_ms / 1000
+        self._cycle = itertools.cycle(predictions)
+        self._lock = threading.Lock()
+        self.requests = 0
+
+    def predict(self, jpeg: bytes) -> dict:
+        if self.delay:
+            time.sleep(self.delay)
+        with self._lock:
+            self.requests += 1
+            prediction = next(self._cycle)
+        return {"prediction": prediction, "raw": {"mock": True}}
+
+    def stats(self) -> dict:
+        return {"backend": "mock", "requests": self.requests}
+
+
+class OnnxPredictor(Predictor):
+    """Inferencia en proceso con ONNX Runtime sobre CPU.
+
+    Decodifica el JPEG, lo lleva al tamaño de entrada del modelo (NCHW o NHWC, RGB en [0, 1])
+    y toma el argmax de la primera salida. Las etiquetas salen de la metadata "labels" del
+    modelo (separadas por comas) o del parámetro `labels`.
+    """
+
+    def __init__(self, model_path, labels=None, threads: int = 0):
+        try:
+            import onnxruntime as ort
+        except ImportError as e:
+            raise RuntimeError("El backend 'onnx' necesita onnxruntime (pip install onnxruntime)") from e
+
+        opts = ort.SessionOptions()
+        if threads:
+            opts.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(str(model_path), sess_options=opts,
+                                            providers=["CPUExecutionProvider"])
+        inp = self.session.get_inputs()[0]
+        self.input_name = inp.name
+        shape = [d if isinstance(d, int) else -1 for d in inp.shape]
+        # [N, C, H, W] si el segundo eje es de canales, si no [N, H, W, C]
+        self.channels_first = shape[1] in (1, 3)
+        self.height, self.width = (shape[2], shape[3]) if self.channels_first else (shape[1], shape[2])
+        if self.height <= 0 or self.width <= 0:
+            raise ValueError(f"El modelo tiene tamaño de entrada dinámico: {inp.shape}")
+
+        meta = self.session.get_modelmeta().custom_metadata_map
+        if labels is None and "labels" in meta:
+            labels = [s.strip() for s in meta["labels"].split(",")]
+        self.labels = list(labels or (LABEL_OK, "incorrecta"))
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.total_ms = 0.0
+
+    def _prepare(self, jpeg: bytes):
+        import cv2
+        import numpy as np
+
+        frame = cv2.imdecode(np.frombuffer(jpeg, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if frame is None:
+            raise ValueError("No se pudo decodificar el JPEG")
+        frame = cv2.resize(frame, (self.width, self.height), interpolation=cv2.INTER_AREA)
+        frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB).astype(np.float32) / 255.0
+        if self.channels_first:
+            frame = frame.transpose(2, 0, 1)
+        return frame[None, ...]
+
+    def predict(self, jpeg: bytes) -> dict:
+        t0 = time.perf_counter()
+        try:
+            scores = self.session.run(None, {self.input_name: self._prepare(jpeg)})[0][0]
+        except Exception as e:
+            return {"error": f"ONNX: {e}"}
+        idx = int(scores.argmax())
+        elapsed = (time.perf_counter() - t0) * 1000
+        with self._lock:
+            self.requests += 1
+            self.total_ms += elapsed
+        label = self.labels[idx] if idx < len(self.labels) else str(idx)
+        return {"prediction": label, "raw": {"index": idx, "scores": scores.tolist()}}
+
+    def stats(self) -> dict:
+        with self._lock:
+            avg = self.total_ms / self.requests if self.requests else 0.0
+            return {"backend": "onnx", "requests": self.requests, "avg_ms": round(avg, 2)}
+
+
+def create_predictor(mode: str = None) -> Predictor:
+    """Crea el backend configurado en PREDICT_MODE ("http", "stream", "local", "onnx" o "mock").
+
+    En modo "stream" los frames van por el WebSocket, pero igual se crea el cliente HTTP.
+    """
+    mode = mode or config.PREDICT_MODE
+    if mode == "mock":
+        return MockPredictor(config.MOCK_PREDICTIONS.split(","), delay_ms=config.MOCK_DELAY_MS)
+    if mode == "onnx":
+        labels = config.ONNX_LABELS.split(",") if config.ONNX_LABELS else None
+        return OnnxPredictor(config.ONNX_MODEL_PATH, labels=labels, threads=config.ONNX_THREADS)
+    if mode == "local":
+        from local_transport import LocalPredictClient
+        return LocalPredictClient(
+            config.LOCAL_ADDRESS,
+            use_shm=config.LOCAL_USE_SHM,
+            shm_slots=config.LOCAL_SHM_SLOTS,
+            shm_slot_size=config.LOCAL_SHM_SLOT_SIZE,
+            timeout=config.PREDICT_DEADLINE,
+        )
+    from predict_client import PredictClient
+    return PredictClient(
+        config.PREDICT_URL,
+        pool_size=config.INFERENCE_WORKERS,
+        connect_timeout=config.PREDICT_CONNECT_TIMEOUT,
+        read_timeout=config.PREDICT_READ_TIMEOUT,
+        deadline=config.PREDICT_DEADLINE,
+        retries=config.PREDICT_RETRIES,
+        backoff_base=config.PREDICT_BACKOFF_BASE,
+        backoff_max=config.PREDICT_BACKOFF_MAX,
+        transport=config.PREDICT_TRANSPORT,
+        batch_url=config.PREDICT_BATCH_URL,
+    )
@@ -0,0 +1,131 @@
+# src/preprocess.py
+import json
+import logging
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+log = logging.getLogger(__name__)
+
+ROI_NONE = "none"          # frame completo
+ROI_FIXED = "fixed"        # ROI de la configuración
+ROI_CALIBRATED = "calibrated"  # ROI guardada en el archivo de calibración
+ROI_DETECT = "detect"      # ROI encontrada con un detector de OpenCV
+ROI_MODES = (ROI_NONE, ROI_FIXED, ROI_CALIBRATED, ROI_DETECT)
+
+
+def parse_size(text: str):
+    """'224x224' -> (224, 224); vacío o '0x0' -> None (no redimensionar)."""
+    if not text:
+        return None
+    w, h = (int(v) for v in text.lower().split("x"))
+    return (w, h) if w > 0 and h > 0 else None
+
+
+def parse_roi(text: str):
+    """'x,y,w,h' en fracciones del frame (0-1) -> tupla de floats, o None."""
+    if not text:
+        return None
+    roi = tuple(float(v) for v in text.split(","))
+    if len(roi) != 4:
+        raise ValueError(f"ROI inválida: {text!r} (se espera x,y,w,h)")
+    return roi
+
+
+def load_calibration(path):
+    """Lee {"roi": [x, y, w, h]} (fracciones) del archivo de calibración; None si no existe."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return tuple(float(v) for v in json.load(f)["roi"])
+    except FileNotFoundError:
+        return None
+
+
+def save_calibration(path, roi):
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"roi": [round(v, 4) for v in roi]}, f)
+
+
+class FramePreprocessor:
+    """Recorta el frame a la región del alumno y lo lleva a la resolución del modelo antes de
+    codificarlo. Menos píxeles significa menos tiempo de JPEG, menos bytes y menos decodificación
+    en el servidor.
+
+    La ROI se expresa en fracciones del frame (x, y, w, h) para no depender de la resolución
+    de la cámara. En modo "detect" se busca el torso con un Haar cascade cada `detect_every`
+    frames y se agrega un margen alrededor; si no se encuentra nada se usa la última ROI
+    conocida (o el frame completo).
+    """
+
+    def __init__(self, roi_mode: str = ROI_NONE, roi=None, calibration_path=None,
+                 model_size=None, detect_every: int = 15, detect_margin: float = 0.15):
+        if roi_mode not in ROI_MODES:
+            raise ValueError(f"Modo de ROI desconocido: {roi_mode}")
+        self.roi_mode = roi_mode
+        self.model_size = model_size
+        self.detect_every = max(1, detect_every)
+        self.detect_margin = detect_margin
+        self._frames = 0
+        self._out = None
+
+        self.roi = None
+        if roi_mode == ROI_FIXED:
+            self.roi = roi
+        elif roi_mode == ROI_CALIBRATED:
+            self.roi = load_calibration(calibration_path) if calibration_path else None
+            if self.roi is None:
+                log.warning(f"[ROI] Sin calibración en {calibration_path}; se usa el frame completo")
+
+        self._detector = None
+        if roi_mode == ROI_DETECT:
+            cascade = cv2.data.haarcascades + "haarcascade_upperbody.xml"
+            self._detector = cv2.CascadeClassifier(cascade)
+            if self._detector.empty():
+                log.warning(f"[ROI] No se pudo cargar {cascade}; se usa el frame completo")
+                self._detector = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.roi_mode != ROI_NONE or self.model_size is not None
+
+    def _detect(self, frame_bgr):
+        h, w = frame_bgr.shape[:2]
+        scale = 320 / max(w, h)
+        small = cv2.resize(frame_bgr, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        found = self._detector.detectMultiScale(gray, scaleFactor=1.1, minNeighbors=3)
+        if len(found) == 0:
+            return
+        # quedarse con la detección más grande y agregarle margen
+        x, y, bw, bh = max(found, key=lambda r: r[2] * r[3])
+        sw, sh = small.shape[1], small.shape[0]
+        m = self.detect_margin
+        x0, y0 = max(0.0, x / sw - m * bw / sw), max(0.0, y / sh - m * bh / sh)
+        x1, y1 = min(1.0, (x + bw) / sw + m * bw / sw), min(1.0, (y + bh) / sh + m * bh / sh)
+        self.roi = (x0, y0, x1 - x0, y1 - y0)
+
+    def _crop(self, frame_bgr):
+        if self.roi is None:
+            return frame_bgr
+        h, w = frame_bgr.shape[:2]
+        x, y, rw, rh = self.roi
+        x0, y0 = int(x * w), int(y * h)
+        x1, y1 = min(w, x0 + max(1, int(rw * w))), min(h, y0 + max(1, int(rh * h)))
+        return frame_bgr[y0:y1, x0:x1]   # vista, sin copia
+
+    def process(self, frame_bgr):
+        """Devuelve el frame recortado y redimensionado. El resultado puede ser una vista del
+        frame o un buffer interno reutilizado: usarlo antes de la próxima llamada."""
+        if self._detector is not None:
+            if self._frames % self.detect_every == 0:
+                self._detect(frame_bgr)
+            self._frames += 1
+        frame = self._crop(frame_bgr)
+        if self.model_size is None:
+            return frame
+        w, h = self.model_size
+        if self._out is None or self._out.shape[:2] != (h, w):
+            self._out = np.empty((h, w, 3), dtype=np.uint8)
+        return cv2.resize(frame, (w, h), dst=self._out, interpolation=cv2.INTER_AREA)
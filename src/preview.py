@@ -0,0 +1,92 @@
+# src/preview.py
+import cv2
+import numpy as np
+from PySide6.QtGui import QImage, QPixmap
+from PySide6.QtWidgets import QLabel
+
+
+class PreviewRenderer:
+    """Dibuja frames BGR en un QLabel reduciendo una sola vez al tamaño del label.
+
+    Usa un buffer NumPy preasignado con el tamaño del label, un QImage en formato
+    BGR888 montado sobre ese buffer (sin cvtColor ni copia intermedia) y un único
+    QPixmap que se reutiliza entre frames. Sólo se reasigna si cambia el tamaño del label.
+    """
+
+    def __init__(self, label: QLabel):
+        self.label = label
+        # el frame ya llega con el tamaño final: evitar que el label vuelva a escalar al pintar
+        self.label.setScaledContents(False)
+        self._buf = None
+        self._qimg = None
+        self._pixmap = QPixmap()
+
+    def _ensure_buffers(self, w: int, h: int):
+        if self._buf is not None and self._buf.shape[0] == h and self._buf.shape[1] == w:
+            return
+        self._buf = np.empty((h, w, 3), dtype=np.uint8)
+        # el QImage no copia: apunta al buffer, que vive mientras viva el renderer
+        self._qimg = QImage(self._buf.data, w, h, 3 * w, QImage.Format_BGR888)
+        self._pixmap = QPixmap(w, h)
+
+    def render(self, frame_bgr):
+        size = self.label.contentsRect().size()
+        w, h = size.width(), size.height()
+        if w <= 0 or h <= 0:
+            return
+        self._ensure_buffers(w, h)
+        cv2.resize(frame_bgr, (w, h), dst=self._buf, interpolation=cv2.INTER_AREA)
+        self._pixmap.convertFromImage(self._qimg)
+        self.label.setPixmap(self._pixmap)
+
+
+def jpeg_size(jpeg: bytes):
+    """(ancho, alto) leídos del marcador SOF del JPEG, sin decodificar. None si no se encuentra."""
+    i = 2
+    n = len(jpeg)
+    while i + 9 < n:
+        if jpeg[i] != 0xFF:
+            return None
+        marker = jpeg[i + 1]
+        if marker == 0xFF:          # relleno entre marcadores
+            i += 1
+            continue
+        length = int.from_bytes(jpeg[i + 2:i + 4], "big")
+        if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            h = int.from_bytes(jpeg[i + 5:i + 7], "big")
+            w = int.from_bytes(jpeg[i + 7:i + 9], "big")
+            return w, h
+        i += 2 + length
+    return None
+
+
+def decode_scaled(jpeg: bytes, w: int, h: int) -> QPixmap:
+    """Decodifica un JPEG ya reducido al tamaño que entra en w x h (manteniendo la proporción).
+
+    Usa la decodificación reducida de libjpeg (1/2, 1/4, 1/8) cuando la imagen es varias veces
+    más grande que el destino, y termina de ajustar con INTER_AREA.
+    """
+    flag = cv2.IMREAD_COLOR
+    size = jpeg_size(jpeg)
+    if size is not None:
+        for factor, reduced in ((8, cv2.IMREAD_REDUCED_COLOR_8), (4, cv2.IMREAD_REDUCED_COLOR_4),
+                                (2, cv2.IMREAD_REDUCED_COLOR_2)):
+            if size[0] // factor >= w and size[1] // factor >= h:
+                flag = reduced
+                break
+    img = cv2.imdecode(np.frombuffer(jpeg, dtype=np.uint8), flag)
+    if img is None:
+        return QPixmap()
+    return fit_pixmap(img, w, h)
+
+
+def fit_pixmap(img, w: int, h: int) -> QPixmap:
+    """QPixmap de un frame BGR reducido (si hace falta) para entrar en w x h sin deformarse."""
+    ih, iw = img.shape[:2]
+    ratio = min(w / iw, h / ih)
+    if ratio < 1.0:
+        img = cv2.resize(img, (max(1, int(iw * ratio)), max(1, int(ih * ratio))), interpolation=cv2.INTER_AREA)
+    img = np.ascontiguousarray(img)
+    qimg = QImage(img.data, img.shape[1], img.shape[0], 3 * img.shape[1], QImage.Format_BGR888)
+    # fromImage copia los píxeles: el pixmap no depende del array
+    return QPixmap.fromImage(qimg)
@@ -0,0 +1,67 @@
+# src/quality.py
+from collections import deque
+
+# Escalas de resolución que se prueban, en orden, cuando la calidad ya está en el mínimo
+SCALE_STEPS = (1.0, 0.75, 0.5)
+
+
+def percentile(values, pct: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    k = min(len(ordered) - 1, max(0, int(round(pct / 100 * (len(ordered) - 1)))))
+    return ordered[k]
+
+
+class QualityController:
+    """Ajusta la calidad JPEG (y opcionalmente la resolución) según la latencia medida.
+
+    Cada `window` resultados calcula el p95 de la latencia de predicción: si supera
+    `target_ms` baja la calidad un `step` (y, con `adapt_scale`, al llegar al mínimo baja la
+    resolución); si queda holgado por debajo (menos de `target_ms * relax`) hace lo inverso,
+    primero recuperando resolución y después calidad. Siempre dentro de [q_min, q_max].
+    """
+
+    def __init__(self, target_ms: float = 250.0, q_min: int = 50, q_max: int = 90,
+                 q_initial: int = 90, step: int = 5, window: int = 10,
+                 adapt_scale: bool = False, relax: float = 0.6):
+        self.target_ms = target_ms
+        self.q_min = q_min
+        self.q_max = q_max
+        self.q_initial = max(q_min, min(q_max, q_initial))
+        self.step = step
+        self.window = window
+        self.adapt_scale = adapt_scale
+        self.relax = relax
+        self._samples = deque(maxlen=window)
+        self.reset()
+
+    def reset(self):
+        self.quality = self.q_initial
+        self._scale_idx = 0
+        self._samples.clear()
+
+    @property
+    def scale(self) -> float:
+        return SCALE_STEPS[self._scale_idx]
+
+    def p95(self) -> float:
+        return percentile(self._samples, 95)
+
+    def record(self, latency_ms: float):
+        """Registra la latencia de un resultado y, si se completó la ventana, reajusta."""
+        self._samples.append(latency_ms)
+        if len(self._samples) < self.window:
+            return
+        p95 = self.p95()
+        self._samples.clear()
+        if p95 > self.target_ms:
+            if self.quality > self.q_min:
+                self.quality = max(self.q_min, self.quality - self.step)
+            elif self.adapt_scale and self._scale_idx < len(SCALE_STEPS) - 1:
+                self._scale_idx += 1
+        elif p95 < self.target_ms * self.relax:
+            if self._scale_idx > 0:
+                self._scale_idx -= 1
+            elif self.quality < self.q_max:
+                self.quality = min(self.q_max, self.quality + self.step)
@@ -0,0 +1,258 @@
+# src/retention.py
+import json
+import logging
+import os
+import shutil
+import sys
+import threading
+import time
+import zipfile
+from pathlib import Path
+
+log = logging.getLogger(__name__)
+
+ARCHIVE_DIR = "archive"         # dentro de captures/
+COMPACTED_MARK = ".compacted"   # la sesión ya quedó sólo con los frames "correcta"
+KEEP_PREDICTIONS = ("correcta",)
+# extensiones que ya vienen comprimidas: se guardan en el zip sin volver a comprimir
+_STORED_SUFFIXES = {".jpg", ".jpeg", ".bin"}
+
+
+def _session_time(path: Path) -> float:
+    """Inicio de la sesión según el nombre (session_<epoch>[.zip]); si no, la fecha de modificación."""
+    stem = path.name.split(".")[0]
+    try:
+        return float(stem.rsplit("_", 1)[1])
+    except (IndexError, ValueError):
+        return path.stat().st_mtime
+
+
+def _size(path: Path) -> int:
+    if path.is_file():
+        return path.stat().st_size
+    return sum(p.stat().st_size for p in path.rglob("*") if p.is_file())
+
+
+# ioprio_set(2) no tiene envoltorio en la libc: número de syscall por arquitectura
+_IOPRIO_SET = {"x86_64": 251, "amd64": 251, "aarch64": 30, "arm64": 30, "i386": 289, "i686": 289}
+_IOPRIO_WHO_PROCESS = 1
+_IOPRIO_CLASS_IDLE = 3
+_IOPRIO_CLASS_SHIFT = 13
+_PROCESS_MODE_BACKGROUND_BEGIN = 0x00100000   # Windows: CPU, disco y memoria en prioridad baja
+
+
+def _lower_priority():
+    """Bajar la prioridad de CPU y de disco de este proceso con las APIs del sistema."""
+    import ctypes
+
+    if sys.platform == "win32":
+        kernel32 = ctypes.windll.kernel32
+        if not kernel32.SetPriorityClass(kernel32.GetCurrentProcess(), _PROCESS_MODE_BACKGROUND_BEGIN):
+            log.warning("[RETENCION] No se pudo pasar a prioridad de fondo")
+        return
+    try:
+        os.nice(19)
+    except OSError:
+        pass
+    if sys.platform.startswith("linux"):
+        import platform
+
+        nr = _IOPRIO_SET.get(platform.machine().lower())
+        libc = ctypes.CDLL(None, use_errno=True)
+        ioprio = _IOPRIO_CLASS_IDLE << _IOPRIO_CLASS_SHIFT
+        if nr is None or libc.syscall(nr, _IOPRIO_WHO_PROCESS, 0, ioprio) != 0:
+            log.warning("[RETENCION] No se pudo bajar la prioridad de disco (ioprio_set)")
+
+
+def _compact_files(session_dir: Path) -> int:
+    """Formato viejo (un .jpg por frame): borrar los frames que no fueron "correcta"."""
+    meta_path = session_dir / "session.json"
+    if not meta_path.exists():
+        return 0
+    with open(meta_path, "r", encoding="utf-8") as f:
+        keep = {Path(m["path"]).name for m in json.load(f).get("frames", [])
+                if m.get("path") and m.get("prediction") in KEEP_PREDICTIONS}
+    reclaimed = 0
+    for path in session_dir.glob("frame_*.jpg"):
+        if path.name not in keep:
+            reclaimed += path.stat().st_size
+            path.unlink()
+    return reclaimed
+
+
+def compact_session(session_dir: Path) -> int:
+    """Dejar en la sesión sólo los frames "correcta". Devuelve los bytes liberados."""
+    from session_store import DATA_FILE, compact
+
+    if (session_dir / DATA_FILE).exists():
+        reclaimed = compact(session_dir, KEEP_PREDICTIONS)
+    else:
+        reclaimed = _compact_files(session_dir)
+    (session_dir / COMPACTED_MARK).touch()
+    return reclaimed
+
+
+def archive_session(session_dir: Path, archive_dir: Path) -> int:
+    """Empaquetar la sesión en archive/<sesión>.zip y borrar la carpeta. Devuelve los bytes liberados."""
+    archive_dir.mkdir(parents=True, exist_ok=True)
+    before = _size(session_dir)
+    target = archive_dir / f"{session_dir.name}.zip"
+    tmp = target.with_suffix(".zip.tmp")
+    with zipfile.ZipFile(tmp, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=6) as zf:
+        for path in sorted(session_dir.rglob("*")):
+            if path.is_file():
+                kind = zipfile.ZIP_STORED if path.suffix.lower() in _STORED_SUFFIXES else zipfile.ZIP_DEFLATED
+                zf.write(path, f"{session_dir.name}/{path.relative_to(session_dir).as_posix()}", compress_type=kind)
+    with open(tmp, "rb+") as f:
+        os.fsync(f.fileno())
+    os.replace(tmp, target)
+    shutil.rmtree(session_dir)
+    return before - target.stat().st_size
+
+
+def run_maintenance(captures_dir, max_age_days: float = 0, max_bytes: int = 0, keep_only_correct: bool = False,
+                    compact_after_days: float = 1, archive_after_days: float = 0, min_age_hours: float = 1,
+                    low_priority: bool = True) -> dict:
+    """Aplica las políticas de retención sobre captures/ y devuelve un reporte.
+
+    En orden: compactar (sólo "correcta") las sesiones de más de `compact_after_days`,
+    archivar en zip las de más de `archive_after_days`, borrar sesiones y archivos de más de
+    `max_age_days` y, si captures/ sigue pesando más de `max_bytes`, borrar desde lo más
+    viejo. Un valor 0 desactiva la política. Nunca toca sesiones de menos de `min_age_hours`
+    (la sesión en curso incluida), y no compacta ni archiva las que todavía tienen frames en
+    el spool: el reenvío tiene que poder corregir su contenedor y su session.json.
+    """
+    from spool import SPOOL_DIR
+
+    if low_priority:
+        _lower_priority()
+    captures_dir = Path(captures_dir)
+    archive_dir = captures_dir / ARCHIVE_DIR
+    now = time.time()
+    day = 86400
+    # restos de una pasada anterior que se cortó a mitad de un zip
+    for tmp in archive_dir.glob("*.zip.tmp") if archive_dir.exists() else ():
+        tmp.unlink()
+    report = {"compacted": 0, "archived": 0, "deleted": 0, "errors": 0, "bytes_before": _size(captures_dir)}
+
+    spool_dir = captures_dir / SPOOL_DIR
+
+    def sessions():
+        dirs = [p for p in captures_dir.glob("session_*") if p.is_dir()]
+        return sorted((p for p in dirs if now - _session_time(p) > min_age_hours * 3600), key=_session_time)
+
+    def settled(path):
+        return not any(spool_dir.glob(f"{path.name}_*.json"))
+
+    def apply(action, path, counter):
+        try:
+            action(path)
+            report[counter] += 1
+        except (OSError, ValueError) as e:
+            log.warning(f"[RETENCION] {path.name}: {e}")
+            report["errors"] += 1
+
+    if keep_only_correct:
+        for path in sessions():
+            if (now - _session_time(path) > compact_after_days * day and not (path / COMPACTED_MARK).exists()
+                    and settled(path)):
+                apply(compact_session, path, "compacted")
+    if archive_after_days:
+        for path in sessions():
+            if now - _session_time(path) > archive_after_days * day and settled(path):
+                apply(lambda p: archive_session(p, archive_dir), path, "archived")
+
+    def remove(path):
+        if path.is_dir():
+            shutil.rmtree(path)
+        else:
+            path.unlink()
+
+    archives = sorted(archive_dir.glob("session_*.zip"), key=_session_time) if archive_dir.exists() else []
+    if max_age_days:
+        for path in archives + sessions():
+            if now - _session_time(path) > max_age_days * day:
+                apply(remove, path, "deleted")
+    if max_bytes:
+        total = _size(captures_dir)
+        # lo más viejo primero, archivado o no
+        candidates = sorted([p for p in archives if p.exists()] + sessions(), key=_session_time)
+        for path in candidates:
+            if total <= max_bytes:
+                break
+            size = _size(path)
+            apply(remove, path, "deleted")
+            total -= size
+
+    report["bytes_after"] = _size(captures_dir)
+    report["reclaimed"] = report["bytes_before"] - report["bytes_after"]
+    return report
+
+
+def _maintenance_main(captures_dir, policy: dict, conn):
+    """Punto de entrada del proceso de mantenimiento: aplica las políticas y manda el reporte."""
+    try:
+        conn.send(run_maintenance(captures_dir, **policy))
+    except Exception as e:
+        conn.send({"error": str(e)})
+    finally:
+        conn.close()
+
+
+class RetentionService:
+    """Corre el mantenimiento de captures/ en un proceso aparte con prioridad baja.
+
+    trigger() no bloquea: lanza el proceso (si no hay uno corriendo) y un hilo que espera
+    su reporte y lo deja en `last_report`. El GUI no toca el disco en ningún momento.
+    """
+
+    def __init__(self, captures_dir, **policy):
+        self.captures_dir = str(captures_dir)
+        self.policy = policy
+        self.last_report = None
+        self._proc = None
+        self._lock = threading.Lock()
+
+    def running(self) -> bool:
+        return self._proc is not None and self._proc.is_alive()
+
+    def trigger(self) -> bool:
+        """Lanzar una pasada de mantenimiento. Devuelve False si ya había una en curso."""
+        import multiprocessing as mp
+
+        with self._lock:
+            if self.running():
+                return False
+            ctx = mp.get_context("spawn")
+            recv_conn, send_conn = ctx.Pipe(duplex=False)
+            self._proc = ctx.Process(target=_maintenance_main, args=(self.captures_dir, self.policy, send_conn),
+                                     name="heimlich-retention", daemon=True)
+            self._proc.start()
+            send_conn.close()
+        threading.Thread(target=self._wait_report, args=(self._proc, recv_conn),
+                         name="retention-report", daemon=True).start()
+        return True
+
+    def _wait_report(self, proc, conn):
+        try:
+            report = conn.recv()
+        except (EOFError, OSError):
+            proc.join()
+            report = {"error": f"el proceso terminó sin reporte (código {proc.exitcode})"}
+        finally:
+            conn.close()
+        proc.join()
+        self.last_report = report
+        if "error" in report:
+            log.error(f"[RETENCION] Error: {report['error']}")
+        else:
+            log.info(f"[RETENCION] compactadas={report['compacted']} archivadas={report['archived']} "
+                     f"borradas={report['deleted']} liberado={report['reclaimed'] / 2**20:.1f} MB "
+                     f"ocupado={report['bytes_after'] / 2**20:.1f} MB")
+
+    def stop(self, timeout: float = 2.0):
+        """Cortar la pasada en curso (el zip se escribe a un .tmp, así que no queda nada a medias)."""
+        proc = self._proc
+        if proc is not None and proc.is_alive():
+            proc.terminate()
+            proc.join(timeout)
@@ -0,0 +1,187 @@
+# src/session_index.py
+import json
+import logging
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from quality import percentile
+
+log = logging.getLogger(__name__)
+
+INDEX_DB = "index.db"    # dentro de captures/
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    started_at REAL NOT NULL,
+    frames INTEGER NOT NULL,
+    correct INTEGER NOT NULL,
+    errors INTEGER NOT NULL,
+    proba REAL,
+    p95_latency_ms REAL
+);
+CREATE INDEX IF NOT EXISTS sessions_started ON sessions(started_at);
+CREATE TABLE IF NOT EXISTS frames (
+    session_id INTEGER NOT NULL REFERENCES sessions(id) ON DELETE CASCADE,
+    seq INTEGER NOT NULL,
+    ref TEXT,
+    prediction TEXT,
+    error TEXT,
+    latency_ms REAL,
+    capture_to_result_ms REAL,
+    quality TEXT,
+    bytes INTEGER,
+    reused INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (session_id, seq)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS frames_prediction ON frames(prediction, session_id);
+"""
+
+_SESSION_NAME = re.compile(r"session_(\d+)$")
+
+
+def connect(db_path) -> sqlite3.Connection:
+    conn = sqlite3.connect(str(db_path), timeout=10)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA foreign_keys=ON")
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+def summarize(name: str, frames: list, proba=None) -> dict:
+    """Resumen de una sesión a partir de la metadata por frame (la de session.json)."""
+    match = _SESSION_NAME.search(name)
+    latencies = [f["latency_ms"] for f in frames if f.get("latency_ms") is not None]
+    return {
+        "name": name,
+        "started_at": float(match.group(1)) if match else time.time(),
+        "frames": len(frames),
+        "correct": sum(1 for f in frames if f.get("prediction") == "correcta"),
+        "errors": sum(1 for f in frames if f.get("error")),
+        "proba": proba,
+        "p95_latency_ms": percentile(latencies, 95) if latencies else None,
+    }
+
+
+def record_session(conn: sqlite3.Connection, summary: dict, frames: list):
+    """Inserta (o reemplaza) una sesión con sus frames en una sola transacción."""
+    with conn:
+        conn.execute("DELETE FROM sessions WHERE name = ?", (summary["name"],))
+        cur = conn.execute(
+            "INSERT INTO sessions (name, started_at, frames, correct, errors, proba, p95_latency_ms) "
+            "VALUES (:name, :started_at, :frames, :correct, :errors, :proba, :p95_latency_ms)", summary)
+        session_id = cur.lastrowid
+        conn.executemany(
+            "INSERT OR REPLACE INTO frames (session_id, seq, ref, prediction, error, latency_ms, "
+            "capture_to_result_ms, quality, bytes, reused) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [(session_id, f.get("seq", i + 1), f.get("path") or f.get("ref"), f.get("prediction"),
+              f.get("error"), f.get("latency_ms"), f.get("capture_to_result_ms"),
+              None if f.get("quality") is None else str(f["quality"]), f.get("bytes"), int(bool(f.get("reused"))))
+             for i, f in enumerate(frames)])
+
+
+def record_in_background(db_path, name: str, frames: list, proba=None) -> threading.Thread:
+    """Indexa la sesión recién terminada en un hilo aparte (el commit de SQLite no bloquea al GUI)."""
+    frames = [dict(f) for f in frames]
+
+    def run():
+        try:
+            conn = connect(db_path)
+            try:
+                record_session(conn, summarize(name, frames, proba), frames)
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            log.error(f"[INDICE] No se pudo indexar {name}: {e}")
+
+    thread = threading.Thread(target=run, name="session-index", daemon=True)
+    thread.start()
+    return thread
+
+
+def _scan_legacy(session_dir: Path) -> tuple:
+    """Sesión del formato original: sólo frame_*.jpg y errors.log (una línea "<epoch>: <mensaje>"
+    por error). Se indexan los frames y la cantidad de errores, sin predicciones ni puntaje."""
+    frames = [{"seq": i, "path": str(path)} for i, path in enumerate(sorted(session_dir.glob("frame_*.jpg")), 1)]
+    errors = 0
+    try:
+        with open(session_dir / "errors.log", "r", encoding="utf-8", errors="replace") as f:
+            errors = sum(1 for line in f if line.strip())
+    except OSError:
+        pass
+    if not frames and not errors:
+        return None
+    summary = summarize(session_dir.name, frames)
+    summary["errors"] = errors
+    return summary, frames
+
+
+def scan_session(session_dir) -> tuple:
+    """Lee una carpeta de sesión (session.json o, si la app se cortó, manifest.jsonl; las
+    sesiones viejas, sólo con frame_*.jpg y errors.log, se indexan sin puntaje).
+
+    Devuelve (resumen, frames) o None si la carpeta no tiene nada que indexar.
+    """
+    from session_manifest import MANIFEST_FILE, read_manifest
+
+    session_dir = Path(session_dir)
+    frames, proba = None, None
+    meta_path = session_dir / "session.json"
+    if meta_path.exists():
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            frames, proba = data.get("frames", []), data.get("proba")
+        except (OSError, ValueError):
+            frames = None
+    if frames is None and (session_dir / MANIFEST_FILE).exists():
+        merged = read_manifest(session_dir)
+        frames = [merged[seq] for seq in sorted(s for s in merged if s is not None)]
+    if frames is None:
+        return _scan_legacy(session_dir)
+    return summarize(session_dir.name, frames, proba), frames
+
+
+def rebuild(captures_dir, db_path=None, workers: int = None) -> int:
+    """Reconstruye el índice recorriendo captures/session_* con varios procesos.
+
+    Los procesos sólo leen y parsean; las inserciones las hace este proceso, en orden.
+    Devuelve la cantidad de sesiones indexadas.
+    """
+    captures_dir = Path(captures_dir)
+    db_path = db_path or captures_dir / INDEX_DB
+    dirs = sorted(p for p in captures_dir.glob("session_*") if p.is_dir())
+    conn = connect(db_path)
+    count = 0
+    try:
+        with conn:
+            conn.execute("DELETE FROM sessions")
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for result in pool.map(scan_session, dirs, chunksize=64):
+                if result is not None:
+                    record_session(conn, *result)
+                    count += 1
+        conn.execute("ANALYZE")
+    finally:
+        conn.close()
+    return count
+
+
+def average_score(conn: sqlite3.Connection, since: float = 0.0, until: float = None):
+    """Promedio de `proba` de las sesiones en [since, until). None si no hay sesiones."""
+    row = conn.execute("SELECT AVG(proba) FROM sessions WHERE started_at >= ? AND started_at < ? "
+                       "AND proba IS NOT NULL", (since, until or float("inf"))).fetchone()
+    return row[0]
+
+
+def recent_sessions(conn: sqlite3.Connection, limit: int = 20) -> list:
+    rows = conn.execute("SELECT name, started_at, frames, correct, errors, proba, p95_latency_ms FROM sessions "
+                        "ORDER BY started_at DESC LIMIT ?", (limit,))
+    cols = ("name", "started_at", "frames", "correct", "errors", "proba", "p95_latency_ms")
+    return [dict(zip(cols, row)) for row in rows]
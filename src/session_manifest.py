@@ -0,0 +1,68 @@
+# src/session_manifest.py
+import json
+import os
+import time
+from pathlib import Path
+
+MANIFEST_FILE = "manifest.jsonl"
+
+EVENT_FRAME = "frame"     # el frame se capturó (y se guardó, si hay "ref")
+EVENT_RESULT = "result"   # llegó la predicción (o el error) del frame
+
+
+def wall_time(monotonic_ts: float) -> float:
+    """Pasa un instante de time.monotonic() a epoch, para que el manifiesto se pueda cruzar con otros logs."""
+    return time.time() - (time.monotonic() - monotonic_ts)
+
+
+class SessionManifest:
+    """Manifiesto de la sesión: un JSON por línea, agregado a medida que pasan las cosas.
+
+    Cada frame escribe un registro "frame" al capturarse y un registro "result" cuando llega
+    su predicción; ambos llevan `seq`. Se puede seguir en vivo (tail -f) y, si la app se cae,
+    queda todo lo registrado hasta ese momento. No es seguro entre hilos: lo usa sólo el
+    SessionWriter.
+    """
+
+    def __init__(self, session_dir):
+        self.path = Path(session_dir) / MANIFEST_FILE
+        self._file = open(self.path, "a", encoding="utf-8")
+
+    @property
+    def closed(self) -> bool:
+        return self._file.closed
+
+    def write(self, record: dict):
+        self._file.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+
+    def flush(self):
+        self._file.flush()
+
+    def sync(self):
+        self.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        self.flush()
+        self._file.close()
+
+
+def read_manifest(path) -> dict:
+    """Lee un manifiesto y devuelve {seq: registro}, uniendo "frame" y "result" de cada frame.
+
+    Ignora una última línea incompleta (la app se cortó mientras escribía).
+    """
+    path = Path(path)
+    if path.is_dir():
+        path = path / MANIFEST_FILE
+    frames = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            merged = frames.setdefault(record.get("seq"), {})
+            merged.update(record)
+            merged.pop("event", None)
+    return frames
@@ -0,0 +1,209 @@
+# src/session_store.py
+import mmap
+import os
+import struct
+import time
+from pathlib import Path
+
+DATA_FILE = "frames.bin"     # JPEGs concatenados
+INDEX_FILE = "frames.idx"    # un registro fijo por frame
+# seq, offset, largo, timestamp (epoch), predicción (utf-8, rellena con \0; vacía = pendiente)
+INDEX_RECORD = struct.Struct("<IQId32s")
+_PREDICTION_OFFSET = struct.calcsize("<IQId")
+
+
+def frame_ref(session_dir, seq: int) -> str:
+    """Identificador de un frame dentro del contenedor (reemplaza a la ruta del .jpg)."""
+    return f"{Path(session_dir) / DATA_FILE}#{seq}"
+
+
+class SessionContainer:
+    """Contenedor de sesión append-only: un archivo con los JPEG concatenados y un índice
+    de registros fijos (offset, largo, timestamp, predicción).
+
+    Los datos sólo se agregan al final; la predicción, que llega después, se escribe en su
+    lugar dentro del registro del índice. No es seguro entre hilos: lo usa sólo el
+    SessionWriter.
+    """
+
+    def __init__(self, session_dir):
+        self.dir = Path(session_dir)
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self._data = open(self.dir / DATA_FILE, "ab")
+        self._size = self._data.tell()
+        index_path = self.dir / INDEX_FILE
+        index_path.touch(exist_ok=True)
+        self._index = open(index_path, "r+b")
+        self._positions = {}    # seq -> número de registro
+        raw = self._index.read()
+        complete = len(raw) // INDEX_RECORD.size
+        for i, rec in enumerate(INDEX_RECORD.iter_unpack(raw[:complete * INDEX_RECORD.size])):
+            self._positions[rec[0]] = i
+        # descartar un registro a medio escribir (corte de luz, cierre abrupto)
+        self._index.seek(complete * INDEX_RECORD.size)
+        self._index.truncate()
+        self._early = {}        # predicciones que llegaron antes que su frame
+
+    def append(self, seq: int, data: bytes, timestamp: float = None):
+        offset = self._size
+        self._data.write(data)
+        self._size += len(data)
+        prediction = self._early.pop(seq, "")
+        record = INDEX_RECORD.pack(seq, offset, len(data), timestamp or time.time(),
+                                   prediction.encode("utf-8")[:32])
+        self._index.seek(0, os.SEEK_END)
+        self._positions[seq] = self._index.tell() // INDEX_RECORD.size
+        self._index.write(record)
+
+    def set_prediction(self, seq: int, prediction: str):
+        pos = self._positions.get(seq)
+        if pos is None:
+            self._early[seq] = prediction
+            return
+        self._index.seek(pos * INDEX_RECORD.size + _PREDICTION_OFFSET)
+        self._index.write(prediction.encode("utf-8")[:32].ljust(32, b"\0"))
+
+    @property
+    def closed(self) -> bool:
+        return self._data.closed
+
+    def flush(self):
+        self._data.flush()
+        self._index.flush()
+
+    def sync(self):
+        self.flush()
+        os.fsync(self._data.fileno())
+        os.fsync(self._index.fileno())
+
+    def close(self):
+        self.flush()
+        self._data.close()
+        self._index.close()
+
+
+class SessionReader:
+    """Lectura con acceso aleatorio a un contenedor de sesión, con el archivo de datos
+    mapeado en memoria: frame() devuelve una vista sin copia del JPEG."""
+
+    def __init__(self, session_dir):
+        self.dir = Path(session_dir)
+        raw = (self.dir / INDEX_FILE).read_bytes()
+        raw = raw[:len(raw) - len(raw) % INDEX_RECORD.size]
+        self.records = []
+        for seq, offset, length, timestamp, prediction in INDEX_RECORD.iter_unpack(raw):
+            self.records.append({"seq": seq, "offset": offset, "length": length, "timestamp": timestamp,
+                                 "prediction": prediction.rstrip(b"\0").decode("utf-8", "replace")})
+        self._by_seq = {r["seq"]: i for i, r in enumerate(self.records)}
+        self._file = open(self.dir / DATA_FILE, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        # mmap de un archivo vacío no está permitido
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+
+    def __len__(self):
+        return len(self.records)
+
+    def frame(self, i: int) -> memoryview:
+        r = self.records[i]
+        return memoryview(self._map)[r["offset"]:r["offset"] + r["length"]]
+
+    def frame_by_seq(self, seq: int) -> memoryview:
+        return self.frame(self._by_seq[seq])
+
+    def last_with_prediction(self, prediction: str):
+        """Índice del último frame con esa predicción, o None."""
+        for i in range(len(self.records) - 1, -1, -1):
+            if self.records[i]["prediction"] == prediction:
+                return i
+        return None
+
+    def export(self, out_dir) -> int:
+        """Escribe cada frame como frame_XXX_<seq>.jpg en out_dir. Devuelve cuántos exportó."""
+        out = Path(out_dir)
+        out.mkdir(parents=True, exist_ok=True)
+        for i, r in enumerate(self.records):
+            (out / f"frame_{i + 1:03d}_{r['seq']}.jpg").write_bytes(self.frame(i))
+        return len(self.records)
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+        self._file.close()
+
+
+def convert_directory(session_dir, delete: bool = False) -> int:
+    """Pasa una sesión con el formato viejo (un frame_XXX_*.jpg por frame) al contenedor.
+
+    Las predicciones se toman de session.json si existe; el timestamp, de la fecha de
+    modificación de cada archivo. Con `delete` se borran los .jpg convertidos.
+    """
+    import json
+
+    session_dir = Path(session_dir)
+    if (session_dir / INDEX_FILE).exists():
+        return 0
+    frames = sorted(session_dir.glob("frame_*.jpg"))
+    predictions = {}
+    meta_path = session_dir / "session.json"
+    if meta_path.exists():
+        with open(meta_path, "r", encoding="utf-8") as f:
+            for m in json.load(f).get("frames", []):
+                if m.get("path"):
+                    predictions[Path(m["path"]).name] = m.get("prediction") or (
+                        f"ERROR: {m['error']}" if "error" in m else "")
+    container = SessionContainer(session_dir)
+    try:
+        for seq, path in enumerate(frames, start=1):
+            container.append(seq, path.read_bytes(), path.stat().st_mtime)
+            if predictions.get(path.name):
+                container.set_prediction(seq, predictions[path.name])
+        container.sync()
+    finally:
+        container.close()
+    if delete:
+        for path in frames:
+            path.unlink()
+    return len(frames)
+
+
+def _finish_compact(session_dir: Path, tmp_dir: Path):
+    for name in (INDEX_FILE, DATA_FILE):
+        if (tmp_dir / name).exists():
+            os.replace(tmp_dir / name, session_dir / name)
+    (tmp_dir / "READY").unlink()
+    tmp_dir.rmdir()
+
+
+def compact(session_dir, keep=("correcta",)) -> int:
+    """Reescribe el contenedor dejando sólo los frames cuya predicción está en `keep`.
+
+    El contenedor nuevo se arma en una subcarpeta y se marca como listo antes de reemplazar
+    al viejo; si la compactación se corta a mitad del reemplazo, la próxima llamada lo termina.
+    Devuelve los bytes liberados.
+    """
+    import shutil
+
+    session_dir = Path(session_dir)
+    tmp_dir = session_dir / ".compact"
+    if (tmp_dir / "READY").exists():
+        _finish_compact(session_dir, tmp_dir)
+    elif tmp_dir.exists():
+        shutil.rmtree(tmp_dir)
+    before = (session_dir / DATA_FILE).stat().st_size + (session_dir / INDEX_FILE).stat().st_size
+    reader = SessionReader(session_dir)
+    container = SessionContainer(tmp_dir)
+    try:
+        for i, r in enumerate(reader.records):
+            if r["prediction"] in keep:
+                view = reader.frame(i)
+                container.append(r["seq"], view, r["timestamp"])
+                view.release()
+                container.set_prediction(r["seq"], r["prediction"])
+        container.sync()
+    finally:
+        container.close()
+        reader.close()
+    after = (tmp_dir / DATA_FILE).stat().st_size + (tmp_dir / INDEX_FILE).stat().st_size
+    (tmp_dir / "READY").touch()
+    _finish_compact(session_dir, tmp_dir)
+    return before - after
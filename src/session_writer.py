@@ -0,0 +1,271 @@
+# src/session_writer.py
+import logging
+import os
+import queue
+import threading
+from collections import deque
+
+log = logging.getLogger(__name__)
+
+FSYNC_NONE = "none"          # dejar que el sistema operativo decida cuándo bajar a disco
+FSYNC_SESSION = "session"    # fsync de todos los archivos de la sesión al terminarla
+FSYNC_FRAME = "frame"        # fsync de cada archivo apenas se escribe
+FSYNC_POLICIES = (FSYNC_NONE, FSYNC_SESSION, FSYNC_FRAME)
+
+_SYNC = object()   # marca en la cola: sincronizar lo escrito hasta acá
+_WAKE = object()   # marca en la cola: hay predicciones para aplicar
+
+
+def _fsync_path(path):
+    # en Windows os.fsync necesita un descriptor con permiso de escritura
+    with open(path, "rb+") as f:
+        os.fsync(f.fileno())
+
+
+class SessionWriter:
+    """Escribe los frames de la sesión en disco desde un hilo propio.
+
+    El hilo del GUI sólo encola: write() para un .jpg suelto o append() para un
+    SessionContainer. Hay lugar para `max_queue` frames sin escribir: si no queda, se espera
+    hasta `backpressure_ms` y, si sigue lleno, se descarta el frame y se cuenta en `dropped`.
+    El hilo escritor toma todo lo encolado de una vez y lo escribe en lote (un flush por lote),
+    aplicando la política de fsync configurada. Las predicciones (set_prediction), los
+    registros del manifiesto (log) y los pedidos de control (export, cierre, sync) no ocupan
+    lugar de frame: nunca se descartan ni bloquean al que los encola.
+    """
+
+    def __init__(self, max_queue: int = 64, fsync_policy: str = FSYNC_NONE, backpressure_ms: int = 5):
+        if fsync_policy not in FSYNC_POLICIES:
+            raise ValueError(f"Política de fsync desconocida: {fsync_policy}")
+        self.fsync_policy = fsync_policy
+        self.backpressure = backpressure_ms / 1000
+        # cola sin tope (mantiene el orden entre frames y pedidos de control); el límite de
+        # frames sin escribir lo pone el semáforo
+        self._queue = queue.Queue()
+        self._slots = threading.Semaphore(max_queue)
+        self._updates = deque()
+        self._dirty = set()        # contenedores y manifiestos con datos sin flush en este lote
+        self._unsynced = []
+        self._open = set()         # contenedores y manifiestos abiertos (para fsync)
+        self._lock = threading.Lock()
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.bytes_written = 0
+        self._thread = threading.Thread(target=self._run, name="session-writer", daemon=True)
+        self._thread.start()
+
+    def _enqueue(self, item) -> bool:
+        if not self._slots.acquire(timeout=self.backpressure):
+            with self._lock:
+                self.dropped += 1
+            return False
+        self._queue.put(item)
+        return True
+
+    def write(self, path, data: bytes) -> bool:
+        """Encola un archivo para escribir. Devuelve False si se descartó por cola llena."""
+        return self._enqueue(("file", path, data))
+
+    def append(self, container, seq: int, data: bytes, timestamp: float = None) -> bool:
+        """Encola un frame para agregar al contenedor. Devuelve False si se descartó."""
+        return self._enqueue(("append", container, seq, data, timestamp))
+
+    def export(self, store, frames, quality: int = 90):
+        """Encola la codificación y el guardado de frames que quedaron crudos en un FrameStore.
+
+        `frames` es una lista de (destino, seq, predicción, timestamp): el destino es un SessionContainer o
+        la ruta del .jpg. El store pasa a ser del escritor: el GUI no lo vuelve a tocar. Nunca se
+        descarta por contrapresión (es un solo elemento en la cola).
+        """
+        self._queue.put(("export", store, frames, quality))
+
+    def set_prediction(self, container, seq: int, prediction: str):
+        """Anota la predicción de un frame del contenedor (se aplica en el hilo escritor)."""
+        self._update(container, container.set_prediction, seq, prediction)
+
+    def log(self, manifest, record: dict):
+        """Agrega un registro al manifiesto de la sesión (se escribe en el hilo escritor)."""
+        self._update(manifest, manifest.write, record)
+
+    def _update(self, target, method, *args):
+        self._updates.append((target, method, args))
+        self._queue.put(_WAKE)
+
+    def close_container(self, container):
+        """Sincroniza (según la política) y cierra el contenedor o manifiesto después de lo ya encolado."""
+        self._queue.put(("close", container))
+
+    def call_after(self, fn):
+        """Ejecuta `fn` en el hilo escritor cuando termine lo ya encolado (cierres incluidos)."""
+        self._queue.put(("call", fn))
+
+    def sync(self):
+        """Pide fsync de lo escrito hasta ahora (con la política "session"; si no, no hace nada)."""
+        if self.fsync_policy == FSYNC_SESSION:
+            self._queue.put(_SYNC)
+
+    def flush(self):
+        """Bloquea hasta que todo lo encolado esté escrito."""
+        self._queue.join()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"written": self.written, "dropped": self.dropped, "failed": self.failed,
+                    "bytes": self.bytes_written, "queued": self._queue.qsize()}
+
+    def reset_stats(self):
+        with self._lock:
+            self.written = 0
+            self.dropped = 0
+            self.failed = 0
+            self.bytes_written = 0
+
+    def close(self):
+        self.sync()
+        self._queue.put(None)
+        self._thread.join(5)
+
+    def _take_batch(self):
+        items = [self._queue.get()]
+        while True:
+            try:
+                items.append(self._queue.get_nowait())
+            except queue.Empty:
+                return items
+
+    def _run(self):
+        while True:
+            batch = self._take_batch()
+            stop = False
+            for item in batch:
+                try:
+                    if item is None:
+                        stop = True
+                    elif item is _SYNC:
+                        self._sync_pending()
+                    elif item is not _WAKE:
+                        self._handle(item)
+                except OSError as e:
+                    log.error(f"[WRITER] Error de disco: {e}")
+                    with self._lock:
+                        self.failed += 1
+                except Exception as e:
+                    # un error inesperado no puede matar al hilo: el GUI se quedaría sin escritor
+                    log.error(f"[WRITER] Error inesperado: {e!r}")
+                    with self._lock:
+                        self.failed += 1
+                finally:
+                    if isinstance(item, tuple) and item[0] in ("file", "append"):
+                        self._slots.release()
+                    self._queue.task_done()
+            self._apply_updates()
+            self._flush_dirty()
+            if stop:
+                return
+
+    def _handle(self, item):
+        kind = item[0]
+        if kind == "file":
+            self._write_one(item[1], item[2])
+        elif kind == "append":
+            _, container, seq, data, timestamp = item
+            container.append(seq, data, timestamp)
+            if self.fsync_policy == FSYNC_FRAME:
+                container.sync()
+            else:
+                self._dirty.add(container)
+            self._open.add(container)
+            with self._lock:
+                self.written += 1
+                self.bytes_written += len(data)
+        elif kind == "export":
+            import cv2
+
+            _, store, frames, quality = item
+            for target, seq, prediction, timestamp in frames:
+                frame = store.get(seq)
+                if frame is None:
+                    continue
+                ok, buf = cv2.imencode(".jpg", frame, [int(cv2.IMWRITE_JPEG_QUALITY), quality])
+                if not ok:
+                    with self._lock:
+                        self.failed += 1
+                    continue
+                if isinstance(target, (str, os.PathLike)):
+                    self._write_one(target, buf.tobytes())
+                    continue
+                self._handle(("append", target, seq, buf.tobytes(), timestamp))
+                if prediction:
+                    target.set_prediction(seq, str(prediction))
+        elif kind == "close":
+            container = item[1]
+            self._apply_updates()
+            if self.fsync_policy != FSYNC_NONE:
+                container.sync()
+            container.close()
+            self._open.discard(container)
+            self._dirty.discard(container)
+        elif kind == "call":
+            self._apply_updates()
+            item[1]()
+
+    def _apply_updates(self):
+        while self._updates:
+            target, method, args = self._updates.popleft()
+            if target.closed:
+                continue
+            try:
+                method(*args)
+                if self.fsync_policy == FSYNC_FRAME:
+                    target.sync()
+            except Exception as e:
+                log.error(f"[WRITER] Error al aplicar una actualización: {e!r}")
+                with self._lock:
+                    self.failed += 1
+                continue
+            if self.fsync_policy != FSYNC_FRAME:
+                self._dirty.add(target)
+            self._open.add(target)
+
+    def _flush_dirty(self):
+        """Un solo flush por archivo al terminar cada lote."""
+        while self._dirty:
+            target = self._dirty.pop()
+            if target.closed:
+                continue
+            try:
+                target.flush()
+            except OSError as e:
+                log.error(f"[WRITER] Error de disco: {e}")
+                with self._lock:
+                    self.failed += 1
+
+    def _write_one(self, path, data: bytes):
+        try:
+            with open(path, "wb") as f:
+                f.write(data)
+                if self.fsync_policy == FSYNC_FRAME:
+                    f.flush()
+                    os.fsync(f.fileno())
+        except OSError as e:
+            log.error(f"No se pudo guardar la imagen en disco: {e}")
+            with self._lock:
+                self.failed += 1
+            return
+        with self._lock:
+            self.written += 1
+            self.bytes_written += len(data)
+        if self.fsync_policy == FSYNC_SESSION:
+            self._unsynced.append(path)
+
+    def _sync_pending(self):
+        self._apply_updates()
+        for target in self._open:
+            target.sync()
+        paths, self._unsynced = self._unsynced, []
+        for path in paths:
+            try:
+                _fsync_path(path)
+            except OSError as e:
+                log.error(f"[WRITER] fsync falló para {path}: {e}")
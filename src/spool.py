@@ -0,0 +1,331 @@
+# src/spool.py
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from pathlib import Path
+
+log = logging.getLogger(__name__)
+
+SPOOL_DIR = "spool"    # dentro de captures/
+
+
+def _write_atomic(path: Path, data: bytes):
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def _tag_session(session_dir):
+    """Etiquetar los registros de este hilo con la sesión que se está tocando, no con la del GUI."""
+    import app_log
+
+    app_log.set_thread_session(None if session_dir is None else Path(session_dir).name)
+
+
+def _server_down(result) -> bool:
+    """¿El reenvío falló por la red o el servidor (hay que esperar) y no por el frame?
+
+    Sin respuesta (error de red/timeout, sin "status" ni cuerpo) o HTTP 5xx cuentan como
+    servidor caído; cualquier otra respuesta sin predicción es un problema de ese frame.
+    """
+    if result is None:
+        return True
+    if not isinstance(result, dict) or "error" not in result:
+        return False
+    status = result.get("status")
+    if status is not None:
+        return status >= 500
+    return "raw" not in result and "data" not in result
+
+
+def session_score(frames: list):
+    """Puntaje de la sesión como lo calcula la app: 10 * correctas / frames con predicción."""
+    predicted = [f for f in frames if f.get("prediction") is not None]
+    if not predicted:
+        return 0.0
+    return 10 * sum(1 for f in predicted if f["prediction"] == "correcta") / len(predicted)
+
+
+class OfflineSpool:
+    """Cola en disco de los frames que no se pudieron predecir, con reenvío en segundo plano.
+
+    add() sólo encola en memoria; un hilo propio escribe cada frame en captures/spool/
+    (<sesión>_<seq>.jpg + .json) y, cuando el servidor vuelve a responder, los reenvía del más
+    viejo al más nuevo a `rate` frames por segundo. Si el servidor no responde espera (con
+    backoff exponencial entre `retry_min_s` y `retry_max_s`) antes de volver a probar; una
+    respuesta sin predicción sólo cuenta como intento fallido de ese frame y se sigue con el
+    próximo. Cada frame se abandona después de `max_attempts` respuestas sin predicción (mientras
+    el servidor está caído no se gastan intentos).
+
+    Con la respuesta se corrige la sesión ya terminada: registro "result" en el manifiesto,
+    predicción en el índice del contenedor, session.json con el puntaje recalculado y la fila
+    del historial SQLite. Las sesiones en curso (set_active) no se tocan hasta que se liberan
+    con release(), una vez que la app cerró sus archivos.
+    """
+
+    def __init__(self, spool_dir, predict_fn, rate: float = 2.0, retry_min_s: float = 5.0,
+                 retry_max_s: float = 300.0, max_attempts: int = 20, max_bytes: int = 0, index_path=None):
+        self.dir = Path(spool_dir)
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.predict_fn = predict_fn
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self.retry_min = retry_min_s
+        self.retry_max = retry_max_s
+        self.max_attempts = max_attempts
+        self.max_bytes = max_bytes
+        self.index_path = index_path
+        self._incoming = deque()
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._active = set()
+        self._running = True
+        self.spooled = 0
+        self.replayed = 0
+        self.abandoned = 0
+        self._thread = threading.Thread(target=self._run, name="offline-spool", daemon=True)
+        self._thread.start()
+
+    def add(self, session_dir, seq: int, jpeg: bytes, ref=None, captured_at: float = None):
+        """Encolar un frame para reenviarlo más tarde (no bloquea)."""
+        self._incoming.append({"session_dir": str(session_dir), "seq": seq, "ref": None if ref is None else str(ref),
+                               "captured_at": captured_at, "spooled_at": round(time.time(), 3),
+                               "attempts": 0, "jpeg": jpeg})
+        self._wake.set()
+
+    def set_active(self, session_dir):
+        """Sesión en curso: sus frames no se reenvían hasta que se libere con release()."""
+        with self._lock:
+            self._active.add(str(session_dir))
+
+    def release(self, session_dir):
+        """La sesión terminó y sus archivos están cerrados: ya se pueden reenviar sus frames."""
+        with self._lock:
+            self._active.discard(str(session_dir))
+        self._wake.set()
+
+    def pending(self) -> int:
+        return len(list(self.dir.glob("*.json"))) + len(self._incoming)
+
+    def stats(self) -> dict:
+        return {"spooled": self.spooled, "replayed": self.replayed, "abandoned": self.abandoned,
+                "pending": self.pending()}
+
+    def close(self, timeout: float = 2.0):
+        self._running = False
+        self._wake.set()
+        self._thread.join(timeout)
+
+    # --- hilo del spool ---
+
+    def _store_incoming(self):
+        if not self._incoming:
+            return
+        while self._incoming:
+            entry = self._incoming.popleft()
+            jpeg = entry.pop("jpeg")
+            _tag_session(entry["session_dir"])
+            name = f"{Path(entry['session_dir']).name}_{entry['seq']:06d}"
+            try:
+                _write_atomic(self.dir / f"{name}.jpg", jpeg)
+                # el .json va último: sin él, el .jpg no cuenta como pendiente
+                _write_atomic(self.dir / f"{name}.json", json.dumps(entry).encode("utf-8"))
+                self.spooled += 1
+            except OSError as e:
+                log.error(f"[SPOOL] No se pudo guardar el frame {name}: {e}")
+        _tag_session(None)
+        self._enforce_budget()
+
+    def _enforce_budget(self):
+        if not self.max_bytes:
+            return
+        files = sorted(self.dir.glob("*.jpg"))
+        total = sum(p.stat().st_size for p in files)
+        for jpg in files:
+            if total <= self.max_bytes:
+                break
+            total -= jpg.stat().st_size
+            self._discard(jpg.with_suffix(".json"))
+            self.abandoned += 1
+            log.warning(f"[SPOOL] Sin espacio: se descarta {jpg.stem}", extra={"session": jpg.stem.rsplit("_", 1)[0]})
+
+    def _discard(self, meta_path: Path):
+        for path in (meta_path, meta_path.with_suffix(".jpg")):
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+
+    def _next_entries(self) -> list:
+        """Pendientes de sesiones ya terminadas, del más viejo al más nuevo (por nombre)."""
+        with self._lock:
+            active = set(self._active)
+        entries = []
+        for meta_path in sorted(self.dir.glob("*.json")):
+            try:
+                entry = json.loads(meta_path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                self._discard(meta_path)
+                continue
+            if entry["session_dir"] in active:
+                continue
+            entry["_meta_path"] = meta_path
+            entries.append(entry)
+        return entries
+
+    def _run(self):
+        _tag_session(None)
+        wait = self.retry_min
+        retry_at = 0.0
+        while self._running:
+            self._store_incoming()
+            remaining = retry_at - time.monotonic()
+            if remaining > 0:
+                # en backoff: seguir guardando lo que llega, pero no reenviar todavía
+                self._wake.wait(remaining)
+                self._wake.clear()
+                continue
+            entries = self._next_entries()
+            if not entries:
+                self._wake.wait(self.retry_max)
+                self._wake.clear()
+                continue
+            results = {}    # session_dir -> {seq: predicción}
+            failed = False
+            rejected = False    # algún frame volvió sin predicción
+            for n, entry in enumerate(entries, start=1):
+                if not self._running:
+                    break
+                started = time.monotonic()
+                attempts = entry["attempts"]
+                if not self._replay_one(entry, results):
+                    failed = True
+                    break
+                rejected = rejected or entry["attempts"] > attempts
+                self._store_incoming()
+                if n % 50 == 0:
+                    # con colas largas, ir corrigiendo las sesiones de a tandas
+                    self._apply_all(results)
+                # ritmo controlado: no más de `rate` frames por segundo aunque haya miles en cola
+                rest = self.interval - (time.monotonic() - started)
+                if rest > 0:
+                    time.sleep(rest)
+            self._apply_all(results)
+            _tag_session(None)
+            if failed:
+                log.info(f"[SPOOL] Servidor no disponible; reintento en {wait:.0f}s")
+                retry_at = time.monotonic() + wait
+                wait = min(self.retry_max, wait * 2)
+            else:
+                wait = self.retry_min
+                if rejected:
+                    # no volver a mandar enseguida los mismos frames rechazados
+                    retry_at = time.monotonic() + self.retry_min
+
+    def _replay_one(self, entry: dict, results: dict) -> bool:
+        """Reenviar un frame. False si el servidor no respondió (hay que esperar antes de seguir)."""
+        meta_path = entry["_meta_path"]
+        _tag_session(entry["session_dir"])
+        if not Path(entry["session_dir"]).is_dir():
+            # la sesión ya no está (la borró la retención): no hay nada que corregir
+            self._discard(meta_path)
+            self.abandoned += 1
+            return True
+        try:
+            jpeg = meta_path.with_suffix(".jpg").read_bytes()
+        except OSError:
+            self._discard(meta_path)
+            return True
+        result = self.predict_fn(jpeg)
+        prediction = None
+        if isinstance(result, dict) and "prediction" in result:
+            prediction = result["prediction"]
+        elif isinstance(result, str):
+            prediction = result
+        if prediction is None:
+            if _server_down(result):
+                # el servidor no llegó a ver el frame: no cuenta como intento
+                return False
+            # el servidor respondió pero sin predicción: no frenar al resto de la cola
+            log.debug(f"[SPOOL] {meta_path.stem} sin predicción: {result}")
+            entry["attempts"] += 1
+            if entry["attempts"] >= self.max_attempts:
+                log.warning(f"[SPOOL] Se abandona {meta_path.stem} después de {entry['attempts']} intentos")
+                self._discard(meta_path)
+                self.abandoned += 1
+            else:
+                data = {k: v for k, v in entry.items() if not k.startswith("_")}
+                _write_atomic(meta_path, json.dumps(data).encode("utf-8"))
+            return True
+        results.setdefault(entry["session_dir"], {})[entry["seq"]] = prediction
+        self._discard(meta_path)
+        self.replayed += 1
+        return True
+
+    def _apply_all(self, results: dict):
+        for session_dir, predictions in results.items():
+            self._apply(Path(session_dir), predictions)
+        results.clear()
+
+    def _apply(self, session_dir: Path, predictions: dict):
+        """Corregir la sesión terminada con las predicciones que llegaron tarde."""
+        from session_manifest import EVENT_RESULT, SessionManifest
+        from session_store import INDEX_FILE, SessionContainer
+
+        _tag_session(session_dir)
+        try:
+            manifest = SessionManifest(session_dir)
+            try:
+                for seq, prediction in predictions.items():
+                    manifest.write({"event": EVENT_RESULT, "seq": seq, "received_at": round(time.time(), 3),
+                                    "prediction": prediction, "error": None, "replayed": True})
+            finally:
+                manifest.close()
+            if (session_dir / INDEX_FILE).exists():
+                container = SessionContainer(session_dir)
+                try:
+                    for seq, prediction in predictions.items():
+                        container.set_prediction(seq, str(prediction))
+                    container.sync()
+                finally:
+                    container.close()
+            proba = self._update_metadata(session_dir, predictions)
+        except (OSError, ValueError) as e:
+            log.error(f"[SPOOL] No se pudo actualizar {session_dir.name}: {e}")
+            return
+        log.info(f"[SPOOL] {session_dir.name}: {len(predictions)} frames reenviados; puntaje {proba:.2f}")
+        if self.index_path is not None:
+            import sqlite3
+
+            import session_index
+
+            scanned = session_index.scan_session(session_dir)
+            if scanned is None:
+                return
+            try:
+                conn = session_index.connect(self.index_path)
+                try:
+                    session_index.record_session(conn, *scanned)
+                finally:
+                    conn.close()
+            except sqlite3.Error as e:
+                log.error(f"[SPOOL] No se pudo actualizar el historial de {session_dir.name}: {e}")
+
+    @staticmethod
+    def _update_metadata(session_dir: Path, predictions: dict) -> float:
+        meta_path = session_dir / "session.json"
+        if not meta_path.exists():
+            return 0.0
+        with open(meta_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        for frame in data.get("frames", []):
+            if frame.get("seq") in predictions:
+                frame["prediction"] = predictions[frame["seq"]]
+                frame["replayed"] = True
+                frame.pop("error", None)
+        data["proba"] = session_score(data.get("frames", []))
+        _write_atomic(meta_path, json.dumps(data, indent=1).encode("utf-8"))
+        return data["proba"]
@@ -0,0 +1,118 @@
+# src/stream_client.py
+import json
+import logging
+import struct
+import time
+
+from PySide6.QtCore import QObject, QTimer, QUrl, Signal
+from PySide6.QtNetwork import QAbstractSocket
+from PySide6.QtWebSockets import QWebSocket
+
+log = logging.getLogger(__name__)
+
+# Cabecera de cada frame binario: número de secuencia (uint64 big-endian) + JPEG
+FRAME_HEADER = struct.Struct(">Q")
+
+
+def pack_frame(seq: int, jpeg: bytes) -> bytes:
+    return FRAME_HEADER.pack(seq) + jpeg
+
+
+def unpack_frame(message: bytes):
+    (seq,) = FRAME_HEADER.unpack_from(message)
+    return seq, message[FRAME_HEADER.size:]
+
+
+class StreamingPredictor(QObject):
+    """Canal de inferencia persistente sobre WebSocket.
+
+    Los frames se envían como mensajes binarios (seq + JPEG) sin esperar respuesta y las
+    predicciones vuelven como texto JSON {"id": seq, "prediction": ...} en cualquier orden.
+    Vive en el hilo del GUI: QWebSocket es asíncrono y no bloquea el loop de eventos.
+    Si hay más de `max_in_flight` frames sin respuesta, el frame nuevo se descarta.
+    """
+
+    # (seq, resultado con la forma de post_request)
+    result_ready = Signal(int, object)
+
+    def __init__(self, url: str, max_in_flight: int = 8, reconnect_ms: int = 1000, parent=None):
+        super().__init__(parent)
+        self.url = url
+        self.max_in_flight = max(1, max_in_flight)
+        self._in_flight = {}    # seq -> instante de envío
+        self._closing = False
+        self.sent = 0
+        self.dropped = 0
+        self.received = 0
+
+        self.ws = QWebSocket()
+        self.ws.textMessageReceived.connect(self._on_message)
+        self.ws.disconnected.connect(self._on_disconnected)
+
+        self._reconnect = QTimer(self)
+        self._reconnect.setSingleShot(True)
+        self._reconnect.setInterval(reconnect_ms)
+        self._reconnect.timeout.connect(self.open)
+
+    def open(self):
+        self._closing = False
+        self.ws.open(QUrl(self.url))
+
+    def close(self):
+        self._closing = True
+        self._reconnect.stop()
+        self.ws.close()
+
+    def send(self, seq: int, jpeg: bytes) -> bool:
+        """Envía un frame. Devuelve False si no hay conexión o se alcanzó el máximo en vuelo."""
+        if not self.ws.isValid():
+            self.dropped += 1
+            # si la apertura falló no siempre llega 'disconnected': reintentar desde acá
+            unconnected = self.ws.state() == QAbstractSocket.SocketState.UnconnectedState
+            if unconnected and not self._closing and not self._reconnect.isActive():
+                self._reconnect.start()
+            return False
+        if len(self._in_flight) >= self.max_in_flight:
+            self.dropped += 1
+            return False
+        self._in_flight[seq] = time.monotonic()
+        self.ws.sendBinaryMessage(pack_frame(seq, jpeg))
+        self.sent += 1
+        return True
+
+    def stats(self) -> dict:
+        return {"sent": self.sent, "received": self.received, "dropped": self.dropped,
+                "in_flight": len(self._in_flight)}
+
+    def reset_stats(self):
+        self.sent = 0
+        self.received = 0
+        self.dropped = 0
+
+    def _on_message(self, text: str):
+        try:
+            data = json.loads(text)
+            seq = int(data["id"])
+        except (ValueError, KeyError, TypeError):
+            log.warning(f"[STREAM] Mensaje inválido: {text[:200]}")
+            return
+        if self._in_flight.pop(seq, None) is None:
+            return
+        self.received += 1
+        prediction = data.get("prediction")
+        if "error" in data:
+            result = {"error": data["error"], "data": data}
+        elif prediction is None:
+            result = {"error": "Campo 'prediction' ausente", "data": data}
+        else:
+            result = {"prediction": prediction, "raw": data}
+        self.result_ready.emit(seq, result)
+
+    def _on_disconnected(self):
+        # los frames sin respuesta no van a llegar: informarlos como error
+        pending, self._in_flight = self._in_flight, {}
+        for seq in pending:
+            self.result_ready.emit(seq, {"error": f"WebSocket desconectado: {self.ws.errorString()}"})
+        if not self._closing:
+            log.warning("[STREAM] Conexión perdida; reintentando.")
+            self._reconnect.start()
@@ -0,0 +1,82 @@
+# tools/bench_local.py
+# Compara la latencia de un pedido de predicción por HTTP en loopback contra el transporte
+# local (socket Unix / memoria compartida), usando los servidores stub de tools/. Los stubs
+# corren en otro intérprete, como el servidor real: así no comparten el GIL con el cliente
+# ni el resource_tracker que lleva la cuenta de los segmentos de memoria compartida.
+#
+#   python tools/bench_local.py [-n 500] [--size 60000]
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+from local_transport import LocalPredictClient  # noqa: E402
+from predict_client import PredictClient  # noqa: E402
+from stub_http_server import start_stub_server  # noqa: E402
+from stub_local_server import StubLocalServer  # noqa: E402
+
+
+def serve_stubs(address: str):
+    """Proceso de los servidores: escribe el puerto HTTP y atiende hasta que se cierre stdin."""
+    http = start_stub_server()
+    local = StubLocalServer(address).start()
+    print(http.server_address[1], flush=True)
+    sys.stdin.read()
+    local.close()
+    http.shutdown()
+
+
+def measure(predict, jpeg: bytes, n: int):
+    predict(jpeg)  # calentar conexión
+    lat = []
+    for _ in range(n):
+        t0 = time.perf_counter()
+        result = predict(jpeg)
+        lat.append((time.perf_counter() - t0) * 1000)
+        if "error" in result:
+            raise RuntimeError(result)
+    return statistics.median(lat), statistics.quantiles(lat, n=20)[-1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latencia HTTP loopback vs transporte local")
+    parser.add_argument("-n", type=int, default=500, help="pedidos por transporte")
+    parser.add_argument("--size", type=int, default=60000, help="bytes del JPEG simulado")
+    parser.add_argument("--serve", metavar="ADDRESS", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.serve:
+        return serve_stubs(args.serve)
+    jpeg = os.urandom(args.size)
+
+    if hasattr(socket, "AF_UNIX"):
+        address = str(Path(tempfile.mkdtemp()) / "predict.sock")
+    else:
+        address = "127.0.0.1:8765"
+    server = subprocess.Popen([sys.executable, __file__, "--serve", address],
+                              stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+    port = int(server.stdout.readline())
+
+    clients = {
+        "http (octet)": PredictClient(f"http://127.0.0.1:{port}/predictOne",
+                                      pool_size=1, transport="octet"),
+        f"socket ({address})": LocalPredictClient(address),
+        "socket + shm": LocalPredictClient(address, use_shm=True),
+    }
+    print(f"JPEG simulado de {args.size} bytes, {args.n} pedidos por transporte")
+    print(f"{'transporte':<40} {'p50 ms':>8} {'p95 ms':>8}")
+    for name, client in clients.items():
+        p50, p95 = measure(client.predict, jpeg, args.n)
+        client.close()
+        print(f"{name:<40} {p50:>8.3f} {p95:>8.3f}")
+    server.stdin.close()
+    server.wait(5)
+
+
+if __name__ == "__main__":
+    main()
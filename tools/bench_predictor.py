@@ -0,0 +1,46 @@
+# tools/bench_predictor.py
+# Mide la latencia de un backend de predicción sin levantar la interfaz.
+#
+#   python tools/make_tiny_model.py
+#   python tools/bench_predictor.py --mode onnx --model models/tiny.onnx
+#   python tools/bench_predictor.py --mode mock
+import argparse
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+from bench_transport import sample_jpeg  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de backends de predicción")
+    parser.add_argument("--mode", default="onnx", help="http, local, onnx o mock")
+    parser.add_argument("--model", help="modelo ONNX (sobreescribe HEIMLICH_ONNX_MODEL_PATH)")
+    parser.add_argument("--image", help="JPEG de ejemplo; si se omite se genera uno")
+    parser.add_argument("-n", type=int, default=200)
+    args = parser.parse_args()
+    if args.model:
+        os.environ["HEIMLICH_ONNX_MODEL_PATH"] = str(Path(args.model).resolve())
+
+    # config lee el entorno al importarse
+    from predictors import create_predictor
+
+    predictor = create_predictor(args.mode)
+    jpeg = sample_jpeg(args.image)
+    print("primer resultado:", predictor.predict(jpeg))
+    lat = []
+    for _ in range(args.n):
+        t0 = time.perf_counter()
+        predictor.predict(jpeg)
+        lat.append((time.perf_counter() - t0) * 1000)
+    predictor.close()
+    print(f"{args.mode}: p50={statistics.median(lat):.2f} ms p95={statistics.quantiles(lat, n=20)[-1]:.2f} ms "
+          f"({args.n} predicciones, JPEG de {len(jpeg)} bytes)")
+    print("stats:", predictor.stats())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+# tools/bench_transport.py
+# Compara tamaño de payload y latencia de punta a punta de cada transporte de PredictClient.
+#
+#   python tools/bench_transport.py                       # contra un stub local
+#   python tools/bench_transport.py --url http://127.0.0.1:8000/predictOne --image frame.jpg
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+import requests
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+from predict_client import PredictClient, TRANSPORTS, build_request_kwargs  # noqa: E402
+from stub_http_server import start_stub_server  # noqa: E402
+
+
+def sample_jpeg(path=None, quality: int = 90) -> bytes:
+    if path:
+        return Path(path).read_bytes()
+    # frame sintético de 640x480 con gradiente y ruido (parecido en tamaño a uno de webcam)
+    h, w = 480, 640
+    grad = np.linspace(0, 255, w, dtype=np.uint8)[None, :, None]
+    frame = np.broadcast_to(grad, (h, w, 3)).copy()
+    frame = cv2.add(frame, np.random.default_rng(0).integers(0, 40, (h, w, 3), dtype=np.uint8))
+    ok, buf = cv2.imencode(".jpg", frame, [int(cv2.IMWRITE_JPEG_QUALITY), quality])
+    return buf.tobytes()
+
+
+def payload_size(url: str, transport: str, jpeg: bytes) -> int:
+    req = requests.Request("POST", url, **build_request_kwargs(transport, jpeg)).prepare()
+    return len(req.body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de transportes de /predictOne")
+    parser.add_argument("--url", help="endpoint real; si se omite se usa un stub local")
+    parser.add_argument("--image", help="JPEG de ejemplo; si se omite se genera uno")
+    parser.add_argument("-n", type=int, default=200, help="pedidos por transporte")
+    args = parser.parse_args()
+
+    url = args.url
+    if url is None:
+        srv = start_stub_server()
+        url = f"http://127.0.0.1:{srv.server_address[1]}/predictOne"
+    jpeg = sample_jpeg(args.image)
+
+    print(f"JPEG: {len(jpeg)} bytes, {args.n} pedidos por modo, {url}")
+    print(f"{'modo':<10} {'payload':>9} {'p50 ms':>8} {'p95 ms':>8}")
+    for transport in TRANSPORTS:
+        client = PredictClient(url, pool_size=1, transport=transport)
+        client.predict(jpeg)  # calentar conexión y negociar
+        lat = []
+        for _ in range(args.n):
+            t0 = time.perf_counter()
+            client.predict(jpeg)
+            lat.append((time.perf_counter() - t0) * 1000)
+        client.close()
+        p95 = statistics.quantiles(lat, n=20)[-1]
+        print(f"{client.active_transport():<10} {payload_size(url, transport, jpeg):>9} "
+              f"{statistics.median(lat):>8.2f} {p95:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+# tools/calibrate_roi.py
+# Toma un frame de la cámara, deja marcar con el mouse la región del alumno y la guarda
+# en el archivo de calibración que usa PREPROCESS_ROI_MODE=calibrated.
+#
+#   python tools/calibrate_roi.py [--camera 0]
+import argparse
+import sys
+from pathlib import Path
+
+import cv2
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+import config  # noqa: E402
+from preprocess import save_calibration  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Calibrar la ROI del alumno")
+    parser.add_argument("--camera", type=int, default=0)
+    parser.add_argument("--out", default=config.PREPROCESS_CALIBRATION_PATH)
+    args = parser.parse_args()
+
+    cap = cv2.VideoCapture(args.camera)
+    ok, frame = cap.read()
+    cap.release()
+    if not ok:
+        sys.exit("No se pudo leer un frame de la cámara.")
+
+    x, y, w, h = cv2.selectROI("Marcar la región del alumno y presionar Enter", frame, showCrosshair=False)
+    cv2.destroyAllWindows()
+    if w == 0 or h == 0:
+        sys.exit("No se marcó ninguna región.")
+    fh, fw = frame.shape[:2]
+    roi = (x / fw, y / fh, w / fw, h / fh)
+    save_calibration(args.out, roi)
+    print(f"ROI {roi} guardada en {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+# tools/convert_sessions.py
+# Pasa las sesiones guardadas con el formato viejo (un .jpg por frame) al contenedor
+# frames.bin + frames.idx, o exporta un contenedor a .jpg sueltos para revisarlo.
+#
+#   python tools/convert_sessions.py [--captures captures] [--delete]
+#   python tools/convert_sessions.py --export captures/session_XXX --out /tmp/frames
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+from session_store import SessionReader, convert_directory  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convertir sesiones al contenedor de un solo archivo")
+    parser.add_argument("--captures", default=str(Path(__file__).resolve().parents[1] / "captures"))
+    parser.add_argument("--delete", action="store_true", help="borrar los .jpg convertidos")
+    parser.add_argument("--export", metavar="SESION", help="exportar un contenedor a .jpg sueltos")
+    parser.add_argument("--out", help="carpeta destino de --export (por defecto SESION/export)")
+    args = parser.parse_args()
+
+    if args.export:
+        reader = SessionReader(args.export)
+        try:
+            n = reader.export(args.out or Path(args.export) / "export")
+        finally:
+            reader.close()
+        print(f"{n} frames exportados")
+        return
+
+    total = 0
+    for session_dir in sorted(Path(args.captures).glob("session_*")):
+        n = convert_directory(session_dir, delete=args.delete)
+        if n:
+            print(f"{session_dir.name}: {n} frames")
+        total += n
+    print(f"Total: {total} frames convertidos")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+# tools/make_tiny_model.py
+# Genera un modelo ONNX mínimo (1x3x64x64 -> 2 clases) para probar y medir el backend
+# PREDICT_MODE=onnx sin el modelo real. Las predicciones no significan nada.
+#
+#   python tools/make_tiny_model.py [--out models/tiny.onnx]
+import argparse
+from pathlib import Path
+
+import numpy as np
+import onnx
+from onnx import TensorProto, helper, numpy_helper
+
+
+def build_tiny_model(size: int = 64) -> onnx.ModelProto:
+    rng = np.random.default_rng(0)
+    w = numpy_helper.from_array(rng.normal(size=(2, 3)).astype(np.float32), "W")
+    b = numpy_helper.from_array(np.zeros(2, dtype=np.float32), "B")
+    nodes = [
+        helper.make_node("GlobalAveragePool", ["input"], ["pooled"]),
+        helper.make_node("Flatten", ["pooled"], ["flat"]),
+        helper.make_node("Gemm", ["flat", "W", "B"], ["logits"], transB=1),
+        helper.make_node("Softmax", ["logits"], ["probs"], axis=1),
+    ]
+    graph = helper.make_graph(
+        nodes, "tiny-heimlich",
+        [helper.make_tensor_value_info("input", TensorProto.FLOAT, [1, 3, size, size])],
+        [helper.make_tensor_value_info("probs", TensorProto.FLOAT, [1, 2])],
+        initializer=[w, b],
+    )
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", 13)])
+    helper.set_model_props(model, {"labels": "correcta,incorrecta"})
+    onnx.checker.check_model(model)
+    return model
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Genera un modelo ONNX de prueba")
+    parser.add_argument("--out", default=str(Path(__file__).resolve().parents[1] / "models" / "tiny.onnx"))
+    parser.add_argument("--size", type=int, default=64)
+    args = parser.parse_args()
+    out = Path(args.out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    onnx.save(build_tiny_model(args.size), str(out))
+    print(f"Modelo guardado en {out}")
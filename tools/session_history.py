@@ -0,0 +1,54 @@
+# tools/session_history.py
+# Consulta y reconstrucción del índice SQLite de sesiones (captures/index.db).
+#
+#   python tools/session_history.py rebuild [--workers 4]
+#   python tools/session_history.py stats [--days 7]
+#   python tools/session_history.py recent [--limit 20]
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+import session_index  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Historial de sesiones")
+    parser.add_argument("command", choices=("rebuild", "stats", "recent"))
+    parser.add_argument("--captures", default=str(Path(__file__).resolve().parents[1] / "captures"))
+    parser.add_argument("--workers", type=int, default=None, help="procesos para leer las sesiones")
+    parser.add_argument("--days", type=float, default=7)
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+    db_path = Path(args.captures) / session_index.INDEX_DB
+
+    if args.command == "rebuild":
+        t0 = time.perf_counter()
+        n = session_index.rebuild(args.captures, db_path, args.workers)
+        print(f"{n} sesiones indexadas en {time.perf_counter() - t0:.1f} s")
+        return
+
+    conn = session_index.connect(db_path)
+    try:
+        t0 = time.perf_counter()
+        if args.command == "stats":
+            avg = session_index.average_score(conn, since=time.time() - args.days * 86400)
+            elapsed = time.perf_counter() - t0
+            print("Sin sesiones con puntaje en el período." if avg is None
+                  else f"Puntaje promedio de los últimos {args.days:g} días: {avg:.2f}")
+        else:
+            rows = session_index.recent_sessions(conn, args.limit)
+            elapsed = time.perf_counter() - t0
+            for r in rows:
+                when = time.strftime("%Y-%m-%d %H:%M", time.localtime(r["started_at"]))
+                proba = "-" if r["proba"] is None else f"{r['proba']:.2f}"
+                print(f"{when}  {r['name']}  frames={r['frames']} correctas={r['correct']} "
+                      f"errores={r['errors']} puntaje={proba}")
+        print(f"(consulta: {elapsed * 1000:.1f} ms)")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+# tools/stub_http_server.py
+# Servidor de predicción de prueba: acepta /predictOne en JSON (base64), octet-stream y
+# multipart, y /predictBatch en JSON o multipart. Siempre predice "correcta".
+# Sirve para medir el cliente sin el modelo real.
+#
+#   python tools/stub_http_server.py [--port 8000] [--json-only]
+import argparse
+import base64
+import json
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"   # keep-alive
+    # encabezados y cuerpo salen en dos escrituras: con Nagle + ACK retardado cada respuesta
+    # esperaría ~40 ms y los benchmarks medirían eso en vez del transporte
+    disable_nagle_algorithm = True
+    accept_binary = True
+    prediction = "correcta"
+
+    def _reply(self, status: int, body: dict):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length)
+        ctype = self.headers.get("Content-Type", "")
+        if self.path.rstrip("/").endswith("/predictBatch"):
+            return self._predict_batch(body, ctype)
+        if ctype.startswith("application/json"):
+            try:
+                base64.b64decode(json.loads(body)["image"])
+            except (ValueError, KeyError):
+                return self._reply(422, {"detail": "JSON inválido"})
+        elif not self.accept_binary:
+            return self._reply(422, {"detail": "Se espera JSON"})
+        self._reply(200, {"prediction": self.prediction})
+
+    def _predict_batch(self, body: bytes, ctype: str):
+        if ctype.startswith("application/json"):
+            try:
+                images = json.loads(body)["images"]
+                ids = [img["id"] for img in images]
+                for img in images:
+                    base64.b64decode(img["image"])
+            except (ValueError, KeyError, TypeError):
+                return self._reply(422, {"detail": "JSON inválido"})
+        elif self.accept_binary:
+            # los ids van en el nombre de cada archivo: "<seq>.jpg"
+            ids = re.findall(rb'filename="([^"]+)\.jpg"', body)
+            ids = [i.decode("utf-8") for i in ids]
+        else:
+            return self._reply(422, {"detail": "Se espera JSON"})
+        self._reply(200, {"predictions": [{"id": i, "prediction": self.prediction} for i in ids]})
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub_server(port: int = 0, accept_binary: bool = True) -> ThreadingHTTPServer:
+    """Levanta el servidor en un hilo daemon y lo devuelve (port=0 elige uno libre)."""
+    handler = type("Handler", (StubHandler,), {"accept_binary": accept_binary})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servidor stub de /predictOne")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--json-only", action="store_true", help="rechazar cuerpos binarios (probar el fallback)")
+    args = parser.parse_args()
+    srv = start_stub_server(args.port, accept_binary=not args.json_only)
+    print(f"Stub escuchando en http://127.0.0.1:{srv.server_address[1]}/predictOne")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        srv.shutdown()
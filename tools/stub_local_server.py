@@ -0,0 +1,98 @@
+# tools/stub_local_server.py
+# Servidor de predicción local de referencia para PREDICT_MODE=local: atiende el protocolo
+# de src/local_transport.py sobre un socket Unix (o 'host:puerto') y lee los frames
+# en línea o desde la memoria compartida del cliente. Siempre predice "correcta".
+#
+#   python tools/stub_local_server.py [--address /tmp/heimlich-predict.sock]
+import argparse
+import os
+import socket
+import sys
+import threading
+from multiprocessing import resource_tracker, shared_memory
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+from local_transport import (KIND_INLINE, KIND_SHM, SHM_REF, parse_address,  # noqa: E402
+                             read_request, send_reply)
+
+
+class StubLocalServer:
+    def __init__(self, address: str, prediction: str = "correcta"):
+        self.address = address
+        self.prediction = prediction
+        self._segments = {}
+        self._lock = threading.Lock()
+        family, addr = parse_address(address)
+        if family != socket.AF_INET and os.path.exists(addr):
+            os.unlink(addr)
+        self.sock = socket.socket(family, socket.SOCK_STREAM)
+        if family == socket.AF_INET:
+            self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind(addr)
+        self.sock.listen()
+
+    def _segment(self, name: str) -> shared_memory.SharedMemory:
+        with self._lock:
+            shm = self._segments.get(name)
+            if shm is None:
+                shm = shared_memory.SharedMemory(name=name)
+                # el segmento es del cliente: que el resource_tracker de este proceso no lo borre
+                try:
+                    resource_tracker.unregister(shm._name, "shared_memory")
+                except Exception:
+                    pass
+                self._segments[name] = shm
+            return shm
+
+    def _load(self, kind: int, payload: bytes) -> bytes:
+        if kind == KIND_INLINE:
+            return payload
+        if kind == KIND_SHM:
+            offset, length = SHM_REF.unpack_from(payload)
+            shm = self._segment(payload[SHM_REF.size:].decode("utf-8"))
+            return bytes(shm.buf[offset:offset + length])
+        raise ValueError(f"Tipo de pedido desconocido: {kind}")
+
+    def _serve_client(self, conn: socket.socket):
+        with conn:
+            while True:
+                try:
+                    kind, _seq, payload = read_request(conn)
+                except (ConnectionError, OSError):
+                    return
+                try:
+                    jpeg = self._load(kind, payload)
+                    body = {"prediction": self.prediction, "bytes": len(jpeg)}
+                except (ValueError, FileNotFoundError) as e:
+                    body = {"error": str(e)}
+                send_reply(conn, body)
+
+    def serve_forever(self):
+        while True:
+            try:
+                conn, _ = self.sock.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._serve_client, args=(conn,), daemon=True).start()
+
+    def start(self) -> "StubLocalServer":
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def close(self):
+        self.sock.close()
+        for shm in self._segments.values():
+            shm.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servidor stub de predicción local")
+    parser.add_argument("--address", default="/tmp/heimlich-predict.sock")
+    args = parser.parse_args()
+    srv = StubLocalServer(args.address)
+    print(f"Stub escuchando en {args.address}")
+    try:
+        srv.serve_forever()
+    except KeyboardInterrupt:
+        srv.close()
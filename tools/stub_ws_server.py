@@ -0,0 +1,80 @@
+# tools/stub_ws_server.py
+# Servidor WebSocket de prueba para el modo PREDICT_MODE=stream. Recibe frames binarios
+# (seq + JPEG) y responde {"id": seq, "prediction": "correcta"} por cada uno.
+#
+#   python tools/stub_ws_server.py [--port 8000] [--delay-ms 20]
+#   python tools/stub_ws_server.py --selftest     # levanta servidor y cliente y verifica el ida y vuelta
+import argparse
+import json
+import sys
+from pathlib import Path
+
+from PySide6.QtCore import QCoreApplication, QTimer
+from PySide6.QtNetwork import QHostAddress
+from PySide6.QtWebSockets import QWebSocketServer
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+from stream_client import StreamingPredictor, unpack_frame  # noqa: E402
+
+
+class StubStreamServer:
+    def __init__(self, port: int = 0, delay_ms: int = 0, prediction: str = "correcta"):
+        self.delay_ms = delay_ms
+        self.prediction = prediction
+        self.clients = []
+        self.server = QWebSocketServer("stub-predictor", QWebSocketServer.SslMode.NonSecureMode)
+        if not self.server.listen(QHostAddress.LocalHost, port):
+            raise RuntimeError(f"No se pudo escuchar en el puerto {port}: {self.server.errorString()}")
+        self.server.newConnection.connect(self._on_connection)
+
+    @property
+    def url(self) -> str:
+        return f"ws://127.0.0.1:{self.server.serverPort()}/predictStream"
+
+    def _on_connection(self):
+        sock = self.server.nextPendingConnection()
+        self.clients.append(sock)
+        sock.binaryMessageReceived.connect(lambda msg, s=sock: self._on_frame(s, msg))
+        sock.disconnected.connect(lambda s=sock: self.clients.remove(s))
+
+    def _on_frame(self, sock, message):
+        seq, _jpeg = unpack_frame(bytes(message))
+        reply = json.dumps({"id": seq, "prediction": self.prediction})
+        QTimer.singleShot(self.delay_ms, lambda: sock.sendTextMessage(reply))
+
+
+def selftest(n: int = 50) -> int:
+    app = QCoreApplication.instance() or QCoreApplication(sys.argv)
+    server = StubStreamServer(delay_ms=5)
+    client = StreamingPredictor(server.url, max_in_flight=n)
+    received = {}
+    client.result_ready.connect(lambda seq, res: received.__setitem__(seq, res))
+
+    def send_all():
+        for seq in range(1, n + 1):
+            client.send(seq, b"\xff\xd8fake-jpeg\xff\xd9")
+
+    def check():
+        ok = sorted(received) == list(range(1, n + 1)) and all("prediction" in r for r in received.values())
+        print(f"selftest: {len(received)}/{n} predicciones recibidas -> {'OK' if ok else 'FALLÓ'}")
+        client.close()
+        app.exit(0 if ok else 1)
+
+    client.ws.connected.connect(send_all)
+    client.open()
+    QTimer.singleShot(3000, check)
+    return app.exec()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servidor stub de /predictStream")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--delay-ms", type=int, default=0, help="demora simulada de cada predicción")
+    parser.add_argument("--selftest", action="store_true")
+    args = parser.parse_args()
+    if args.selftest:
+        sys.exit(selftest())
+    app = QCoreApplication(sys.argv)
+    srv = StubStreamServer(args.port, args.delay_ms)
+    print(f"Stub escuchando en {srv.url}")
+    sys.exit(app.exec())